@@ -6,28 +6,42 @@
 import * as path from 'path';
 
 import { ExtensionContext, workspace, StatusBarItem, window, StatusBarAlignment, commands, ConfigurationTarget} from 'vscode';
-import { LanguageClient, LanguageClientOptions, ServerOptions} from 'vscode-languageclient';
+import { LanguageClient, LanguageClientOptions, ServerOptions, State} from 'vscode-languageclient';
 
 let serverPath: string;
 let languageClient: LanguageClient;
 let kvLangStatusBar: StatusBarItem;
 let kvLangPythonPath: string; // Last path which was used to activate Language server
+let kvLangDaemon: boolean; // Last daemon mode which was used to activate Language server
+let kvLangRunning: boolean = false; // Language server is started and running
 
 function createLanguageClient(command: string, serverPath: string): LanguageClient {
+	// Daemon mode: server.py only forward stdio to the shared server process
+	const args = kvLangDaemon ? [serverPath, 'DAEMON_MODE'] : [serverPath];
 	const serverOptions: ServerOptions = {
-		run : { command: command, args: [serverPath] },
-		debug: { command: command, args: [serverPath, 'DEBUG_MODE'] }
+		run : { command: command, args: args },
+		debug: { command: command, args: args.concat(['DEBUG_MODE']) }
 	};
 	const clientOptions: LanguageClientOptions = {
 		documentSelector: [{scheme: 'file', language: 'kv'},
-		                   {scheme: 'file', language: 'python'}]
+		                   {scheme: 'file', language: 'python'}],
+		synchronize: {configurationSection: 'kvlang',
+		              fileEvents: workspace.createFileSystemWatcher('**/*.{kv,py}')}
 	}
-	return new LanguageClient('kvls', 'KvLang Server', serverOptions, clientOptions, false);
+	const client = new LanguageClient('kvls', 'KvLang Server', serverOptions, clientOptions, false);
+	client.onDidChangeState(event => {
+		// Stopped previous client must not change state of the current one
+		if (client === languageClient) {
+			kvLangRunning = event.newState === State.Running;
+		}
+	});
+	return client;
 }
 
 export function activate(context: ExtensionContext) {
 	serverPath = context.asAbsolutePath(path.join('server', 'server.py'));
 	kvLangPythonPath = getPythonPath();
+	kvLangDaemon = getDaemonMode();
 	languageClient = createLanguageClient(kvLangPythonPath, serverPath);
 	languageClient.start();
 
@@ -54,9 +68,14 @@ export function deactivate(): Thenable<void> {
 
 function restartLanguageServer(): void {
 	let pythonPath = getPythonPath();
+	let daemon = getDaemonMode();
 	if (kvLangPythonPath != pythonPath) {
-		console.log('KvLang: Restart of language server ongoing. Python path has been changed')
 		kvLangStatusBar.tooltip = pythonPath;
+	}
+	// Running server parse documents by python path of their workspace folder. Restart is
+	// required only when server could not be started with previous path or mode has changed.
+	if (kvLangDaemon != daemon || (kvLangPythonPath != pythonPath && !kvLangRunning)) {
+		console.log('KvLang: Restart of language server ongoing. Python path or daemon mode has been changed')
 
 		// Deactivate language client
 		if (languageClient) {
@@ -65,6 +84,7 @@ function restartLanguageServer(): void {
 
 		// Start new language client with new path
 		kvLangPythonPath = pythonPath;
+		kvLangDaemon = daemon;
 		languageClient = createLanguageClient(pythonPath, serverPath);
 		languageClient.start();
 	}
@@ -112,3 +132,8 @@ function getPythonPath(): string {
 	}
 	return pythonPath;
 }
+
+function getDaemonMode(): boolean {
+	const configuration = workspace.getConfiguration('kvlang', null);
+	return configuration.get('daemon', false);
+}
@@ -0,0 +1,54 @@
+"""Module contains configuration of the KvLint loaded from .kvlintrc or client settings."""
+from __future__ import absolute_import
+import os
+import json
+
+KVLINTRC = ".kvlintrc"
+
+class LintConfig(object):
+    """Configuration of the KvLint rules.
+
+    Configuration is created from the settings dictionary with keys
+        disable: List of diagnostic codes which should not be executed.
+        maxLineLength: Maximum length of the line used by diagnostic I001.
+
+    Missing or invalid values keep previous configuration. Maximum length of the line must be
+    at least 1.
+
+    """
+
+    MAX_LINE_LENGTH = 110
+
+    def __init__(self, disable=(), max_line_length=MAX_LINE_LENGTH):
+        """Initialize configuration."""
+        self.disable = frozenset(disable)
+        self.max_line_length = max_line_length
+
+    def enabled(self, code):
+        """Return True when diagnostic with specific code should be executed."""
+        return code not in self.disable
+
+    def update(self, settings):
+        """Return new configuration with values overridden by settings dictionary."""
+        if not isinstance(settings, dict):
+            return self
+        disable = settings.get("disable", self.disable)
+        if not isinstance(disable, (list, tuple, set, frozenset)):
+            disable = self.disable
+        try:
+            max_line_length = int(settings.get("maxLineLength", self.max_line_length))
+        except (TypeError, ValueError):
+            max_line_length = self.max_line_length
+        if max_line_length < 1:
+            max_line_length = self.max_line_length
+        return LintConfig(disable, max_line_length)
+
+def load_kvlintrc(directory):
+    """Return settings dictionary stored in .kvlintrc JSON file of the directory."""
+    if not directory:
+        return {}
+    try:
+        with open(os.path.join(directory, KVLINTRC), mode="r") as file:
+            return json.load(file)
+    except (IOError, OSError, ValueError):
+        return {}
@@ -0,0 +1,326 @@
+"""Module contains daemon mode of the language server.
+
+Daemon is long-lived process listening on the Unix domain socket. Every connection is served by
+its own KvLangServer in a separate thread, so Kivy import and module level caches are shared by
+all windows of the client. Script server.py only forward its stdio to the daemon socket.
+
+"""
+from __future__ import absolute_import
+import hashlib
+import os
+import socket
+import stat
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from kvls.logger import Logger
+from kvls.utils import CHARSET
+
+DAEMON_MODE = "DAEMON_MODE"
+DAEMON_PROCESS = "DAEMON_PROCESS"
+BUFFER_SIZE = 65536
+EXIT_SUCCESS = 0
+EXIT_ERROR = 1
+
+def supported():
+    """Return True when platform support Unix domain sockets."""
+    return os.name == "posix" and hasattr(socket, "AF_UNIX")
+
+def private(directory):
+    """Return True when directory is owned by current user and other users cannot access it."""
+    try:
+        status = os.lstat(directory)
+    except OSError:
+        return False
+    return stat.S_ISDIR(status.st_mode) and status.st_uid == os.getuid() and \
+        not status.st_mode & 0o077
+
+def socket_directory():
+    """Return private directory of the daemon sockets or None when it cannot be used safely.
+
+    $XDG_RUNTIME_DIR is used when it is set. Otherwise directory kvls-uid is created in the
+    temporary directory. Directory created by other user or accessible by other users is
+    rejected, so documents are never sent to the socket of the other user.
+
+    """
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime and private(runtime):
+        return runtime
+    directory = os.path.join(tempfile.gettempdir(), "kvls-{}".format(os.getuid()))
+    try:
+        os.mkdir(directory, 0o700)
+    except OSError:
+        # Directory already exist. Its owner and mode are checked below.
+        pass
+    return directory if private(directory) else None
+
+def socket_path(executable=None):
+    """Return path of the daemon socket or None. Every user and interpreter has its own daemon."""
+    directory = socket_directory()
+    if directory is None:
+        return None
+    executable = executable or sys.executable
+    digest = hashlib.sha1(executable.encode(CHARSET)).hexdigest()[:12]
+    return os.path.join(directory, "kvls-{}.sock".format(digest))
+
+def owned(path):
+    """Return True when path is the socket owned by current user."""
+    try:
+        status = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(status.st_mode) and status.st_uid == os.getuid()
+
+def peer_uid(client):
+    """Return user id of the process on the other side of the socket or None when unknown."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    credentials = struct.Struct("3i")
+    try:
+        return credentials.unpack(client.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                                                    credentials.size))[1]
+    except (IOError, OSError, struct.error):
+        return None
+
+def connect(path):
+    """Return socket connected to the daemon of the current user.
+
+    None is returned when daemon is not running or socket belong to the other user.
+
+    """
+    if not owned(path):
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+    except (IOError, OSError):
+        client.close()
+        return None
+    uid = peer_uid(client)
+    if uid is not None and uid != os.getuid():
+        client.close()
+        return None
+    return client
+
+def spawn(path, script, argv, timeout=10.0):
+    """Start daemon in the new session and return socket connected to it or None."""
+    with open(os.devnull, "r+") as devnull:
+        subprocess.Popen([sys.executable, script, DAEMON_PROCESS] +
+                         [arg for arg in argv if arg != DAEMON_MODE],
+                         stdin=devnull, stdout=devnull, stderr=devnull, close_fds=True,
+                         preexec_fn=os.setsid)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        client = connect(path)
+        if client is not None:
+            return client
+        time.sleep(0.05)
+    return None
+
+def forward(source, destination):
+    """Copy data from one file descriptor to another until end of file."""
+    while True:
+        data = os.read(source, BUFFER_SIZE)
+        if not data:
+            return
+        while data:
+            data = data[os.write(destination, data):]
+
+def proxy(client, stdin, stdout):
+    """Forward stdio to the daemon until daemon close connection."""
+    def requests():
+        """Forward client requests and signal end of input to the daemon."""
+        try:
+            forward(stdin.fileno(), client.fileno())
+        except (IOError, OSError):
+            pass
+        try:
+            client.shutdown(socket.SHUT_WR)
+        except (IOError, OSError):
+            pass
+    thread = threading.Thread(target=requests)
+    thread.daemon = True
+    thread.start()
+    try:
+        forward(client.fileno(), stdout.fileno())
+    except (IOError, OSError):
+        return EXIT_ERROR
+    finally:
+        client.close()
+    return EXIT_SUCCESS
+
+def stream(connection, mode):
+    """Return text stream of the connection with the same behaviour as stdio."""
+    try:
+        return connection.makefile(mode, encoding=CHARSET, newline=None if mode == "r" else "")
+    except TypeError:
+        # Python 2 socket files do not support text mode
+        return connection.makefile(mode + "b")
+
+class KvLangDaemon(object):
+    """Daemon serving language server to the clients connected to the Unix domain socket.
+
+    Daemon exit when there is no connection for idle_timeout seconds. Included file parse cache
+    is shared by all connections. It is keyed by file path, interpreter and file stamp. Symbol
+    index of the files on the disk is shared as well. It is keyed by file path and file stamp.
+    Parser workers of other interpreters are shared and stopped with the daemon. Dependency
+    graph and scanner manifest follow documents opened in the window, so every connection
+    scan its workspace folders itself.
+
+    """
+
+    IDLE_TIMEOUT = 15 * 60
+
+    def __init__(self, path, argv=(), idle_timeout=IDLE_TIMEOUT):
+        """Initialize daemon."""
+        self.path = path
+        self.argv = list(argv)
+        self.idle_timeout = idle_timeout
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.errors = dict()
+        self.symbol_index = None
+        self.workers = None
+        self.listener = None
+        self.bound = False
+
+    def bind(self):
+        """Bind listening socket.
+
+        Return False when other daemon already listen on the path or path is used by other
+        file or user. Only socket of the same user which nobody listen on is removed.
+
+        """
+        client = connect(self.path)
+        if client is not None:
+            client.close()
+            return False
+        if os.path.lexists(self.path):
+            if not owned(self.path):
+                return False
+            try:
+                # Socket of the daemon which did not exit properly
+                os.unlink(self.path)
+            except OSError:
+                return False
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o077)
+        try:
+            self.listener.bind(self.path)
+        except (IOError, OSError):
+            self.listener.close()
+            return False
+        finally:
+            os.umask(umask)
+        self.bound = True
+        self.listener.listen(8)
+        self.listener.settimeout(self.idle_timeout)
+        return True
+
+    def unlink(self):
+        """Remove socket of the daemon. Socket bound later by the other daemon is kept."""
+        if self.bound:
+            self.bound = False
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def serve(self):
+        """Accept connections until daemon is idle for idle_timeout seconds."""
+        if not self.bind():
+            return EXIT_ERROR
+        try:
+            while True:
+                try:
+                    connection, _ = self.listener.accept()
+                except socket.timeout:
+                    if self.idle():
+                        return EXIT_SUCCESS
+                    continue
+                self.start(connection)
+        finally:
+            self.listener.close()
+            self.unlink()
+            if self.workers is not None:
+                self.workers.close()
+
+    def idle(self):
+        """Return True when there is no connection and no client waiting for accept.
+
+        Socket is removed before the last accept, so no client can connect after the check.
+        Client which connected before is served and the daemon exit after it.
+
+        """
+        with self.lock:
+            if self.connections:
+                return False
+        self.unlink()
+        self.listener.settimeout(0)
+        try:
+            while True:
+                connection, _ = self.listener.accept()
+                self.start(connection)
+        except (IOError, OSError):
+            # No other connection is waiting
+            pass
+        finally:
+            self.listener.settimeout(self.idle_timeout)
+        with self.lock:
+            return self.connections == 0
+
+    def start(self, connection):
+        """Start thread serving the accepted connection."""
+        connection.settimeout(None)
+        with self.lock:
+            self.connections += 1
+        thread = threading.Thread(target=self.handle, args=(connection,))
+        thread.daemon = True
+        thread.start()
+
+    def create_server(self, reader, writer):
+        """Create language server of the connection."""
+        # Server import Kivy. Proxy use current module without it to start quickly.
+        from kvls.kvlangserver import KvLangServer
+        server = KvLangServer(reader, writer)
+        server.logger.enable_debug_mode(self.argv)
+        server.profiler.enable_profile_mode(self.argv)
+        server.workspace.errors = self.errors
+        with self.lock:
+            if self.workers is None:
+                self.workers = server.workers
+            if self.symbol_index is None:
+                self.symbol_index = server.symbol_index
+        server.workers = self.workers
+        server.symbol_index = self.symbol_index
+        return server
+
+    def handle(self, connection):
+        """Serve single client connection."""
+        reader = stream(connection, "r")
+        writer = stream(connection, "w")
+        server = None
+        try:
+            server = self.create_server(reader, writer)
+            server.run()
+        except Exception:  # pylint: disable=W0703
+            # Broken client must not stop other connections
+            if server is not None:
+                logger = server.logger
+            else:
+                logger = Logger("KvLangDebug")
+                logger.enable_debug_mode(self.argv)
+            logger.log(Logger.INFO, "Connection closed after error: {}".format(
+                traceback.format_exc()))
+        finally:
+            for file in (reader, writer, connection):
+                try:
+                    file.close()
+                except (IOError, OSError):
+                    pass
+            with self.lock:
+                self.connections -= 1
@@ -1,29 +1,75 @@
 """Module contains classes responsible for document's management in the language server."""
 from __future__ import absolute_import
 import re
-from kvls.utils import EOL
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from kvls.utils import EOL, CHARSET, LINE_BREAKS, NEWLINE, split_lines
+from kvls.extractor import KvExtractor
+from kvls.protocol import line_range
 
 KVLANG_TAG = re.compile("(#<KvLang>[\\S\\s]*?#<\\/KvLang>)")
 KVLANG_TAG_BEGIN = re.compile("#<KvLang>")
+try:
+    NON_BMP = re.compile(u"[\U00010000-\U0010FFFF]")
+except re.error:
+    # Narrow Python build store non-BMP characters as surrogate pairs, same as UTF-16
+    NON_BMP = None
 
 class TextDocumentManager(object):
-    """Manager of the existing TextDocumentItem objects under language server."""
+    """Manager of the existing TextDocumentItem objects under language server.
 
-    def __init__(self):
+    Documents are ordered from the least to the most recently used. Resident size is total of the
+    document sizes updated by the documents when their text, compression or cache change. When
+    document grow over memory budget, cached values of the least recently used documents are
+    dropped and then their text is compressed. Compressed document is restored when it is
+    requested from the manager or its text is read again.
+
+    """
+
+    MEMORY_BUDGET = 8 * 1024 * 1024
+
+    def __init__(self, memory_budget=MEMORY_BUDGET):
         """Initialize document manager."""
-        self.documents = dict()
+        self.documents = OrderedDict()
+        self.memory_budget = memory_budget
+        self.resident_size = 0
 
     def add(self, document):
         """Add new document to the manager."""
+        self.remove(document.uri)
         self.documents[document.uri] = document
+        document.manager = self
+        self.resident_size += document.size
+        self.evict(document)
 
     def remove(self, uri):
-        """Remove document from the manager."""
-        self.documents.pop(uri)
+        """Remove document from the manager. Unknown uri is ignored."""
+        document = self.documents.pop(uri, None)
+        if document is not None:
+            self.resident_size -= document.size
+            document.manager = None
 
     def get(self, uri):
         """Return specific document from the manager."""
-        return self.documents[uri]
+        document = self.documents.pop(uri)
+        self.documents[uri] = document
+        document.restore()
+        self.evict(document)
+        return document
+
+    def evict(self, current):
+        """Drop cached values and then compress least recently used documents.
+
+        Documents are processed only until memory budget is satisfied.
+
+        """
+        for release in (TextDocumentItem.clear_cache, TextDocumentItem.compress):
+            for document in self.documents.values():
+                if self.resident_size <= self.memory_budget:
+                    return
+                if document is not current:
+                    release(document)
 
 class TextDocumentItem(object):
     """Class store information related to specific document item."""
@@ -33,28 +79,170 @@ class TextDocumentItem(object):
         self.uri = uri
         self.language_id = language_id
         self.__text = text
+        self.__compressed = None
+        self.__cache = dict()
+        self.__kept = dict()
+        self.__extractor = None
+        self.manager = None
+        self.version = 0
+
+    def cached(self, key, builder):
+        """Return value created by builder from the document. Value is cached until text change."""
+        try:
+            return self.__cache[key]
+        except KeyError:
+            size = self.size
+            value = self.__cache[key] = builder(self)
+            self.resized(size)
+            return value
+
+    def keep(self, key, value, size):
+        """Keep value of the given size across text changes e.g. previous result of request.
+
+        Kept values are dropped together with cached values when memory budget is exceeded.
+
+        """
+        previous = self.size
+        self.__kept[key] = (value, size)
+        self.resized(previous)
+
+    def kept(self, key):
+        """Return kept value or None when value was not kept or it was dropped."""
+        return self.__kept.get(key, (None, 0))[0]
+
+    def clear_cache(self):
+        """Drop values cached from the document text and kept values."""
+        size = self.size
+        self.__cache.clear()
+        self.__kept.clear()
+        self.__extractor = None
+        self.resized(size)
+
+    def resized(self, size):
+        """Update resident size of the manager after the size of the document was changed.
+
+        Document which grow can exceed memory budget, so other documents are evicted.
+
+        """
+        if self.manager is not None:
+            self.manager.resident_size += self.size - size
+            if self.size > size:
+                self.manager.evict(self)
+
+    @property
+    def resident(self):
+        """Return True when document text is not compressed."""
+        return self.__compressed is None
+
+    @property
+    def size(self):
+        """Return number of characters of the resident text and of the values cached from it.
+
+        Estimated size of the cached values is one more copy of the text. Kept values are counted
+        by their own size.
+
+        """
+        if self.__compressed is None:
+            return len(self.__text) * (2 if self.__cache else 1) + \
+                sum(size for _, size in self.__kept.values())
+        return 0
+
+    def compress(self):
+        """Replace document text by its compressed representation."""
+        if self.__compressed is None:
+            size = self.size
+            self.__compressed = zlib.compress(self.__text.encode(CHARSET), 1)
+            self.__text = None
+            self.__cache.clear()
+            self.__kept.clear()
+            self.__extractor = None
+            self.resized(size)
+
+    def restore(self):
+        """Restore document text from its compressed representation."""
+        if self.__compressed is not None:
+            self.__text = zlib.decompress(self.__compressed).decode(CHARSET)
+            self.__compressed = None
+            self.resized(0)
+
+    @property
+    def source(self):
+        """Return full content of the document."""
+        self.restore()
+        return self.__text
 
     @property
     def text(self):
         """Return document text for specific language id."""
         if self.language_id == LanguageId.PYTHON:
-            match = KVLANG_TAG.search(self.__text)
+            match = KVLANG_TAG.search(self.source)
             if match:
                 return match.group() + EOL
         elif self.language_id == LanguageId.KVLANG:
-            return self.__text
+            return self.source
         return ""
 
     @text.setter
     def text(self, value):
         """Set new content of the document."""
+        size = self.size
         self.__text = value
+        self.__compressed = None
+        self.__cache.clear()
+        self.version += 1
+        self.resized(size)
+
+    @property
+    def regions(self):
+        """Return list of TextDocumentRegion objects with KvLang of the document.
+
+        KvLang document is single region. Python document contain region for every #<KvLang>
+        tag and for every string passed to Builder.load_string. Regions are cached until text
+        change. Strings are located incrementally by extractor kept with the document.
+
+        """
+        if self.language_id == LanguageId.KVLANG:
+            return [self]
+        if self.language_id != LanguageId.PYTHON:
+            return []
+        return self.cached("regions", TextDocumentItem.python_regions)
+
+    def python_regions(self):
+        """Return regions of the #<KvLang> tags and Builder.load_string strings."""
+        source = self.source
+        regions = []
+        line_index = 0
+        line_start = 0
+        position = 0
+        for match in KVLANG_TAG.finditer(source):
+            for newline in NEWLINE.finditer(source, position, match.start()):
+                line_index += 1
+                line_start = newline.end()
+            position = match.start()
+            regions.append(TextDocumentRegion(self.uri, match.group() + EOL, line_index,
+                                              source[line_start:position]))
+        if self.__extractor is None:
+            self.__extractor = KvExtractor()
+        source_lines = None
+        for line_index, column, value in self.__extractor.extract(source):
+            if KVLANG_TAG_BEGIN.search(value) is None:
+                if source_lines is None:
+                    source_lines = split_lines(source)
+                regions.append(TextDocumentRegion(self.uri, value.rstrip() + EOL, line_index,
+                                                  source_lines[line_index][:column]))
+        regions.sort(key=lambda region: region.beginning_index)
+        return regions
+
+    @property
+    def prefix(self):
+        """Return text of the document line before the first character of KvLang."""
+        return ""
 
     @property
     def beginning_index(self):
         """Return line index where KvLang start in document."""
         if self.language_id == LanguageId.PYTHON:
-            lines = self.__text.splitlines()
+            lines = split_lines(self.source)
             line_index = 0
             for line in lines:
                 match = KVLANG_TAG_BEGIN.search(line)
@@ -63,8 +251,135 @@ class TextDocumentItem(object):
                 line_index += 1
         return 0
 
+class TextDocumentRegion(TextDocumentItem):
+    """KvLang region embedded in the Python document.
+
+    Region share uri with its document. Line numbers of the region are shifted by the line index
+    where region start in the document. Columns of the first line are shifted by the prefix, the
+    text of the document line before the region. Trailing whitespace of the string is not part
+    of region.
+
+    """
+
+    def __init__(self, uri, text, beginning_index, prefix=""):
+        """Initialize region which start at beginning_index line of document after prefix."""
+        super(TextDocumentRegion, self).__init__(uri, LanguageId.KVLANG, text)
+        self.region_index = beginning_index
+        self.region_prefix = prefix
+
+    @property
+    def prefix(self):
+        """Return text of the document line before the region."""
+        return self.region_prefix
+
+    @property
+    def beginning_index(self):
+        """Return line index where region start in document."""
+        return self.region_index
+
 class LanguageId(object):
     """Language identifier to identify a document on the server side."""
 
     PYTHON = "python"
     KVLANG = "kv"
+
+class LineIndex(object):
+    """Map character offsets of the text to the line numbers of the document.
+
+    Offsets of the line beginnings are computed once, on first lookup, and searched with bisect.
+
+    Columns of the language server protocol are UTF-16 code units. Character outside of the
+    Basic Multilingual Plane is one code point but two code units. Columns of such characters
+    are collected on first lookup for lines which contain them. Other lines map columns as
+    identity.
+
+    Text embedded in the Python document can start after prefix e.g. Builder.load_string(".
+    Columns of its first line are shifted by UTF-16 length of the prefix.
+
+    """
+
+    __slots__ = ("text", "beginning_index", "shift", "_offsets", "_wide")
+
+    def __init__(self, text, beginning_index=0, prefix=""):
+        """Initialize line index of the text which start at beginning_index line of document."""
+        self.text = text
+        self.beginning_index = beginning_index
+        self.shift = len(prefix)
+        if NON_BMP is not None:
+            self.shift += len(NON_BMP.findall(prefix))
+        self._offsets = None
+        self._wide = None
+
+    @property
+    def offsets(self):
+        """Return offsets of the line beginnings without first line."""
+        if self._offsets is None:
+            self._offsets = [match.end() for match in NEWLINE.finditer(self.text)]
+        return self._offsets
+
+    @property
+    def wide(self):
+        """Return document line numbers and columns of the characters outside of the BMP."""
+        if self._wide is None:
+            self._wide = dict()
+            if NON_BMP is not None:
+                for match in NON_BMP.finditer(self.text):
+                    line = self.line(match.start())
+                    self._wide.setdefault(line, []).append(match.start() -
+                                                           self.line_offset(line))
+        return self._wide
+
+    def line(self, offset):
+        """Return document line number of the character offset."""
+        return self.beginning_index + bisect_right(self.offsets, offset)
+
+    def line_offset(self, line):
+        """Return character offset where document line start."""
+        index = line - self.beginning_index
+        return self.offsets[index - 1] if index > 0 else 0
+
+    def line_text(self, line):
+        """Return text of the document line without line break."""
+        index = line - self.beginning_index
+        if index < 0 or index > len(self.offsets):
+            return ""
+        end = self.offsets[index] if index < len(self.offsets) else len(self.text)
+        return self.text[self.line_offset(line):end].rstrip(LINE_BREAKS)
+
+    def character(self, line, column):
+        """Return UTF-16 column of the character column in the document line."""
+        columns = self.wide.get(line)
+        if columns is not None:
+            column += bisect_left(columns, column)
+        return column + self.shift if line == self.beginning_index else column
+
+    def column(self, line, character):
+        """Return character column of the UTF-16 column in the document line."""
+        if line == self.beginning_index:
+            character -= self.shift
+        columns = self.wide.get(line)
+        if columns is None:
+            return character
+        return character - sum(1 for index, column in enumerate(columns)
+                               if column + index < character)
+
+    def range(self, line, start, end):
+        """Return range of the character columns in the document line."""
+        return line_range(line, self.character(line, start), self.character(line, end))
+
+    def span(self, start, end):
+        """Return range of the character offsets placed in the single line."""
+        line = self.line(start)
+        line_start = self.line_offset(line)
+        return self.range(line, start - line_start, end - line_start)
+
+    def content(self, line):
+        """Return range of the document line without indentation and trailing whitespace."""
+        text = self.line_text(line)
+        stripped = text.strip()
+        start = len(text) - len(text.lstrip())
+        return self.range(line, start, start + len(stripped))
+
+def line_index(document):
+    """Return LineIndex of the document. Method is used as a document cache builder."""
+    return LineIndex(document.text, document.beginning_index, document.prefix)
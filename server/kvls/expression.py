@@ -0,0 +1,206 @@
+"""Module contains validation of the Python expressions used in KvLang property values.
+
+Values are compiled to the abstract syntax tree without execution. Result of the compilation
+is stored in the bounded cache keyed by the expression source, so unchanged values are never
+compiled again.
+
+"""
+from __future__ import absolute_import
+import ast
+import threading
+from collections import OrderedDict
+from kvls.document import line_index
+from kvls.utils import split_lines
+from kvls.protocol import Diagnostic
+from kvls.syntax import LineKind, document_lines
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins
+
+# Names available in every KvLang expression. Kivy store them in kivy.lang.parser.global_idmap
+KIVY_GLOBALS = frozenset(["app", "cm", "dp", "inch", "kivy", "mm", "pt", "rgba", "sp",
+                          "self", "root", "ctx"])
+BUILTINS = frozenset(dir(builtins))
+ARGUMENT = getattr(ast, "arg", ())
+
+class CompiledExpression(object):
+    """Result of the expression compilation.
+
+    Attributes:
+        error: Message of the SyntaxError or None.
+        line: One-based line of the SyntaxError in the expression.
+        names: Tuple of (name, line, column) of the names used but not defined in the expression.
+            Column is the character offset in the line of the expression.
+
+    """
+
+    __slots__ = ("error", "line", "names")
+
+    def __init__(self, error, line, names):
+        """Initialize compiled expression."""
+        self.error = error
+        self.line = line
+        self.names = names
+
+def character_column(source_line, offset):
+    """Return character column of the UTF-8 byte offset reported by the ast module."""
+    encoded = source_line.encode("utf-8")
+    if len(encoded) == len(source_line):
+        return offset
+    return len(encoded[:offset].decode("utf-8", "ignore"))
+
+def compile_expression(source, mode):
+    """Compile expression to the abstract syntax tree and collect names which are not defined."""
+    try:
+        tree = compile(source, "<kvlang>", mode, ast.PyCF_ONLY_AST)
+    except SyntaxError as exception:
+        return CompiledExpression(str(exception.args[0]), exception.lineno or 1, ())
+    except (ValueError, TypeError) as exception:
+        return CompiledExpression(str(exception), 1, ())
+    loaded = dict()
+    bound = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Load):
+                position = (node.lineno, node.col_offset)
+                loaded[node.id] = min(loaded.get(node.id, position), position)
+            else:
+                bound.add(node.id)
+        elif isinstance(node, ARGUMENT):
+            bound.add(node.arg)
+        elif isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            bound.add(node.name)
+        elif isinstance(node, ast.alias):
+            bound.add((node.asname or node.name).split(".")[0])
+        elif isinstance(node, ast.ExceptHandler) and isinstance(node.name, str):
+            bound.add(node.name)
+    source_lines = source.split("\n")
+    return CompiledExpression(None, 0, tuple(
+        (name, line, character_column(source_lines[line - 1], column))
+        for name, (line, column) in sorted(loaded.items(), key=lambda item: item[1])
+        if name not in bound))
+
+class ExpressionCache(object):
+    """Bounded least recently used cache of the compiled expressions.
+
+    Cache is shared by all connections of the daemon. Access is guarded by lock.
+
+    """
+
+    MAX_SIZE = 4096
+
+    def __init__(self, max_size=MAX_SIZE):
+        """Initialize cache."""
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def compile(self, source, mode):
+        """Return compiled expression from the cache or compile it."""
+        key = (mode, source)
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.entries[key] = entry
+                return entry
+        entry = compile_expression(source, mode)
+        with self.lock:
+            if key not in self.entries and len(self.entries) >= self.max_size:
+                self.entries.popitem(last=False)
+            self.entries[key] = entry
+        return entry
+
+EXPRESSIONS = ExpressionCache()
+
+def is_root(kv_line):
+    """Return True when line start root rule or root widget."""
+    return kv_line.indent == 0 and kv_line.kind in (LineKind.RULE, LineKind.WIDGET)
+
+def property_values(kv_lines, text_lines, beginning_index):
+    """Yield root line, property name, value source, document lines and columns of every value.
+
+    Value placed in the following lines is joined with newline like in the Kivy parser. Column
+    is the character offset where value start in the document line.
+
+    """
+    root = None
+    index = 0
+    count = len(kv_lines)
+    while index < count:
+        kv_line = kv_lines[index]
+        index += 1
+        if is_root(kv_line):
+            root = kv_line.line
+        if kv_line.kind != LineKind.PROPERTY or kv_line.name == "id":
+            continue
+        if kv_line.value:
+            yield root, kv_line.name, kv_line.value, [kv_line.line], [kv_line.value_start]
+            continue
+        lines = []
+        while index < count and kv_lines[index].indent > kv_line.indent:
+            if kv_lines[index].kind != LineKind.COMMENT:
+                lines.append(kv_lines[index].line)
+            index += 1
+        if lines:
+            texts = [text_lines[line - beginning_index] for line in lines]
+            yield root, kv_line.name, "\n".join(text.strip() for text in texts), lines, \
+                  [len(text) - len(text.lstrip()) for text in texts]
+
+def analyze(document):
+    """Return syntax errors and undefined names of the document expressions.
+
+    Method is used as a document cache builder. Result is a list of
+    (line, start, end, message, error). Start and end are character columns in the line.
+    Names are defined by #:import and #:set directives, Kivy globals, builtins and ids of the
+    root rule.
+
+    """
+    kv_lines = document.cached("syntax", document_lines)
+    defined = set(KIVY_GLOBALS) | BUILTINS
+    ids = dict()
+    root = None
+    for kv_line in kv_lines:
+        if is_root(kv_line):
+            root = kv_line.line
+        elif kv_line.kind == LineKind.DIRECTIVE and kv_line.name in ("import", "set"):
+            defined.update(kv_line.value.split(None, 1)[:1])
+        elif kv_line.kind == LineKind.PROPERTY and kv_line.name == "id" and kv_line.value:
+            ids.setdefault(root, set()).add(kv_line.value)
+
+    results = []
+    text_lines = split_lines(document.text)
+    for root, name, source, lines, columns in property_values(kv_lines, text_lines,
+                                                              document.beginning_index):
+        handler = name.startswith("on_")
+        compiled = EXPRESSIONS.compile(source, "exec" if handler else "eval")
+        if compiled.error is not None:
+            index = min(compiled.line, len(lines)) - 1
+            results.append((lines[index], columns[index],
+                            columns[index] + len(source.split("\n")[index]),
+                            "Invalid expression: {}".format(compiled.error), True))
+            continue
+        root_ids = ids.get(root, ())
+        for undefined, line, column in compiled.names:
+            if undefined in defined or undefined in root_ids or \
+               (handler and undefined == "args"):
+                continue
+            index = min(line, len(lines)) - 1
+            start = columns[index] + column
+            results.append((lines[index], start, start + len(undefined),
+                            "Undefined name '{}'".format(undefined), False))
+    return results
+
+def expression_diagnostics(document, results, errors):
+    """Return diagnostics of the analyzed syntax errors or of the undefined names."""
+    lines = document.cached("lines", line_index)
+    return [Diagnostic(lines.range(line, start, end), message)
+            for line, start, end, message, error in results if error == errors]
+
+def expression_exception(document, _):
+    """Check if property values are valid Python expressions."""
+    return expression_diagnostics(document, document.cached("expressions", analyze), True)
+
+def undefined_name(document, _):
+    """Check if names used in property values are defined."""
+    return expression_diagnostics(document, document.cached("expressions", analyze), False)
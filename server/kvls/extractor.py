@@ -0,0 +1,202 @@
+"""Module locate KvLang strings passed to Builder.load_string in the Python source.
+
+Source is tokenized with module tokenize. Extractor keep result of the previous run and after
+the edit tokenize only lines between the nearest unchanged top-level statements.
+
+"""
+from __future__ import absolute_import
+import ast
+import tokenize
+from bisect import bisect_left
+from kvls.utils import split_lines
+
+LITERAL = 0
+ASSIGNMENT = 1
+REFERENCE = 2
+IGNORED_TOKENS = (tokenize.NL, tokenize.COMMENT, tokenize.INDENT, tokenize.DEDENT)
+OPENING_BRACKETS = frozenset("([{")
+CLOSING_BRACKETS = frozenset(")]}")
+STRING_PREFIX = "rRuUbBfF"
+TRIPLE_QUOTES = ('"""', "'''")
+LITERAL_END = frozenset([")", ",", ";"])
+
+def string_quotes(token_string):
+    """Return length of the prefix and length of the quotes of the string token."""
+    prefix = len(token_string) - len(token_string.lstrip(STRING_PREFIX))
+    if token_string[prefix:prefix + 3] in TRIPLE_QUOTES:
+        return prefix, 3
+    return prefix, 1
+
+def value_column(column, token_string):
+    """Return column where value of the string token which start at the column start."""
+    prefix, quotes = string_quotes(token_string)
+    return column + prefix + quotes
+
+def string_value(token_string):
+    """Return value of the string token.
+
+    None is returned for bytes and formatted strings. None is returned also when value differ
+    from the source of the string e.g. escape sequence or line continuation, because lines and
+    columns of such value do not map to the lines and columns of the source.
+
+    """
+    try:
+        value = ast.literal_eval(token_string)
+    except (ValueError, SyntaxError):
+        return None
+    if isinstance(value, bytes) and not isinstance(value, str):
+        return None
+    prefix, quotes = string_quotes(token_string)
+    # Parser translate line breaks of the source to \n
+    source = token_string[prefix + quotes:len(token_string) - quotes]
+    if value != source.replace("\r\n", "\n").replace("\r", "\n"):
+        return None
+    return value
+
+class KvExtractor(object):
+    """Locate KvLang strings in the Python source.
+
+    String is KvLang when it is passed directly to Builder.load_string or it is assigned to the
+    top-level name which is passed to Builder.load_string. Strings whose value does not map to
+    their source line by line are skipped.
+
+    Extractor store:
+        lines: Lines of the last extracted source.
+        entries: Sorted list of (row, column, end_row, kind, name, value). Rows are zero-based.
+            Column is the column where value of the string start.
+        statements: Sorted rows of the top-level statements. Tokenizing can start there.
+
+    """
+
+    def __init__(self):
+        """Initialize extractor."""
+        self.lines = []
+        self.entries = []
+        self.statements = []
+
+    def extract(self, text):
+        """Return list of (row, column, value) of the KvLang strings in the source."""
+        # Tokenizer read lines split only by universal newlines, form feed is part of the line
+        lines = split_lines(text, True)
+        old_count = len(self.lines)
+        new_count = len(lines)
+        prefix = 0
+        limit = min(old_count, new_count)
+        while prefix < limit and self.lines[prefix] == lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and \
+              self.lines[old_count - 1 - suffix] == lines[new_count - 1 - suffix]:
+            suffix += 1
+        if prefix == old_count == new_count:
+            return self.regions()
+
+        # Start from the last unchanged top-level statement. Changed line can be indented now.
+        position = bisect_left(self.statements, prefix) - 1
+        start = self.statements[position] if position >= 0 else 0
+        entries = [entry for entry in self.entries if entry[2] < start]
+        statements = self.statements[:max(position, 0)]
+        delta = new_count - old_count
+        stop = self.tokenize(lines, start, new_count - suffix, delta, entries, statements)
+        if stop is not None:
+            # Rest of the source is not changed. Reuse previous result moved by delta.
+            entries.extend((row + delta, column, end_row + delta, kind, name, value)
+                           for row, column, end_row, kind, name, value in self.entries
+                           if row >= stop - delta)
+            statements.extend(row + delta for row in self.statements if row >= stop - delta)
+        self.lines = lines
+        self.entries = entries
+        self.statements = statements
+        return self.regions()
+
+    def tokenize(self, lines, start, unchanged, delta, entries, statements):
+        """Tokenize lines from start row and append found entries and statements.
+
+        Tokenizing stop at the top-level statement in the unchanged part of the source which
+        was also top-level statement in the previous source. Row of this statement is returned.
+        None is returned when source was tokenized to the end.
+
+        Statement is recorded only when brackets before it are balanced. Tokenizer never recover
+        from the unmatched closing bracket so restarting after it would give different result.
+
+        Entry is kept only when the string or name is the whole argument or assigned value.
+
+        """
+        previous_statements = set(self.statements)
+        remaining = iter(lines[start:])
+        readline = lambda: next(remaining, "")
+        state = 0
+        depth = 0
+        line_start = True
+        assignment = None
+        pending = False
+        try:
+            for token in tokenize.generate_tokens(readline):
+                token_type, token_string, (row, column), (end_row, _), _ = token
+                row += start - 1
+                end_row += start - 1
+                if token_type in IGNORED_TOKENS:
+                    continue
+                if pending and token_type not in (tokenize.NEWLINE, tokenize.ENDMARKER) and \
+                   token_string not in LITERAL_END:
+                    # String or name is only part of the expression e.g. "a" "b" or KV % args
+                    entries.pop()
+                pending = False
+                count = len(entries)
+                if line_start and token_type not in (tokenize.NEWLINE, tokenize.ENDMARKER):
+                    line_start = False
+                    if column == 0 and depth == 0:
+                        if row >= unchanged and row - delta in previous_statements:
+                            return row
+                        statements.append(row)
+                        assignment = [token_string] if token_type == tokenize.NAME else None
+                        state = 0
+                elif assignment is not None:
+                    assignment.append(token_string)
+                    if len(assignment) == 3 and assignment[1] == "=" and \
+                       token_type == tokenize.STRING:
+                        value = string_value(token_string)
+                        if value is not None:
+                            entries.append((row, value_column(column, token_string), end_row,
+                                            ASSIGNMENT, assignment[0], value))
+                    if len(assignment) >= 3:
+                        assignment = None
+                if token_type == tokenize.NEWLINE:
+                    line_start = True
+                    continue
+                if token_type == tokenize.OP:
+                    if token_string in OPENING_BRACKETS:
+                        depth += 1
+                    elif token_string in CLOSING_BRACKETS:
+                        depth -= 1
+                state = self.match(state, token_type, token_string, (row, column), end_row,
+                                   entries)
+                pending = len(entries) > count
+        except (tokenize.TokenError, SyntaxError):
+            # Source is incomplete e.g. during typing of the string. Keep found entries.
+            pass
+        return None
+
+    @staticmethod
+    def match(state, token_type, token_string, start, end_row, entries):
+        """Match tokens of Builder.load_string( argument and return next state."""
+        if state == 4:
+            if token_type == tokenize.STRING:
+                value = string_value(token_string)
+                if value is not None:
+                    entries.append((start[0], value_column(start[1], token_string), end_row,
+                                    LITERAL, None, value))
+            elif token_type == tokenize.NAME:
+                entries.append((start[0], start[1], end_row, REFERENCE, token_string, None))
+            return 0
+        if token_type == tokenize.NAME and token_string == "Builder":
+            return 1
+        if (state, token_string) in ((1, "."), (2, "load_string"), (3, "(")):
+            return state + 1
+        return 0
+
+    def regions(self):
+        """Return list of (row, column, value) of the literals and referenced assignments."""
+        references = set(name for _, _, _, kind, name, _ in self.entries if kind == REFERENCE)
+        return [(row, column, value) for row, column, _, kind, name, value in self.entries
+                if kind == LITERAL or (kind == ASSIGNMENT and name in references)]
@@ -6,12 +6,26 @@ specification included in version 3.x of the language server protocol.
 
 """
 from __future__ import absolute_import
+import os
+import threading
 from kvls.message import RequestMessage, ResponseMessage, NotificationMessage, ErrorCodes,\
     MessageType, MessageUtils
-from kvls.kvlint import KvLint
-from kvls.document import TextDocumentItem, TextDocumentManager
+from kvls.kvlint import KvLint, Severity, parse_exception
+from kvls.lang import class_docstring
+from kvls.protocol import Diagnostic, Position, Range
+from kvls.config import LintConfig, load_kvlintrc
+from kvls.workspace import Workspace
+from kvls.scanner import WorkspaceScanner, FileChangeType, LANGUAGES, file_stamp
+from kvls.symbols import SymbolIndex, document_symbols, symbol_information
+from kvls.progress import Progress
+from kvls.tree import folding_ranges, selection_range, class_name
+from kvls.expression import analyze, expression_diagnostics
+from kvls.document import TextDocumentItem, TextDocumentManager, line_index
+from kvls.semantic import LEGEND, delta, encode, document_data, document_tokens
 from kvls.logger import Logger
-from kvls.utils import CHARSET, CharsetException
+from kvls.profiler import Profiler
+from kvls.worker import WorkerPool, WorkerException
+from kvls.utils import CHARSET, CharsetException, uri_to_path, path_to_uri
 
 class KvLangServer(object):
     """Class responsible for managing Language Server Procedures."""
@@ -21,24 +35,64 @@ class KvLangServer(object):
     EXIT_SUCCESS = 0
     EXIT_ERROR = 1
     OFF_LINE = 4
+    SYMBOL_CHUNK = 16
 
     def __init__(self, stdin, stdout):
         """Initialize KvLang server."""
         self.logger = Logger("KvLangDebug")
+        self.profiler = Profiler("KvLangProfile")
         self.reader = stdin
         self.writer = stdout
         self.server_status = self.OFF_LINE
         self.document_manager = TextDocumentManager()
         self.kvlint = KvLint()
+        self.workspace = Workspace(worker=self.worker)
+        self.workspace.register(self.kvlint)
+        self.kvlint.register_document(self.parse_exception, Severity.ERROR, "E001",
+                                      KvLint.SOURCE)
+        self.kvlint.register_document(self.expression_exception, Severity.ERROR, "E004",
+                                      KvLint.SOURCE)
+        self.kvlint.register_document(self.undefined_name, Severity.WARNING, "W002",
+                                      KvLint.SOURCE)
+        self.workers = WorkerPool()
+        self.scanner = WorkspaceScanner(self.workspace)
+        self.scan_thread = None
+        self.lock = threading.Lock()
+        self.symbol_index = SymbolIndex()
+        self.root_path = None
+        self.folders = []
+        self.interpreters = dict()
+        self.configs = dict()
+        self.plans = dict()
+        self.docstrings = dict()
+        self.client_capabilities = dict()
+        self.request_id = 0
+        self.pending_requests = dict()
+        self.result_id = 0
         self.request_procedures = {"initialize": self.initialize,
                                    "textDocument/completion": self.completion,
                                    "completionItem/resolve": self.resolve,
-                                   "shutdown": self.shutdown}
+                                   "textDocument/semanticTokens/full": self.semantic_tokens_full,
+                                   "textDocument/semanticTokens/full/delta":
+                                       self.semantic_tokens_delta,
+                                   "textDocument/semanticTokens/range":
+                                       self.semantic_tokens_range,
+                                   "workspace/symbol": self.workspace_symbol,
+                                   "textDocument/foldingRange": self.folding_range,
+                                   "textDocument/selectionRange": self.selection_range,
+                                   "textDocument/hover": self.hover,
+                                   "shutdown": self.shutdown,
+                                   "$/kvls/profile": self.profile}
         self.notification_procedures = {"initialized": self.initialized,
                                         "textDocument/didSave": self.did_save,
                                         "textDocument/didOpen": self.did_open,
                                         "textDocument/didClose": self.did_close,
                                         "textDocument/didChange": self.did_change,
+                                        "workspace/didChangeConfiguration":
+                                            self.did_change_configuration,
+                                        "workspace/didChangeWatchedFiles":
+                                            self.did_change_watched_files,
+                                        "$/kvls/profile": self.profile,
                                         "exit": self.exit}
 
     def send(self, message):
@@ -47,6 +101,14 @@ class KvLangServer(object):
         self.writer.write(message.build())
         self.writer.flush()
 
+    def request(self, method, params, callback):
+        """Send request to the client. Callback is called with response from the client."""
+        self.request_id += 1
+        self.pending_requests[self.request_id] = callback
+        message = RequestMessage()
+        message.content(params, method, self.request_id)
+        self.send(message)
+
     def handle(self, content):
         """Start hadling input from stdin."""
         content_length = MessageUtils.fetch_content_length(content)
@@ -61,7 +123,14 @@ class KvLangServer(object):
             self.reader.readline()
 
         message_content = MessageUtils.parse_content(self.reader.read(content_length))
-        if MessageUtils.is_notification(message_content):
+        if MessageUtils.is_response(message_content):
+            response = ResponseMessage()
+            response.assign_message_content(message_content)
+            self.logger.log_message(response)
+            callback = self.pending_requests.pop(response.request_id, None)
+            if callback is not None:
+                callback(response)
+        elif MessageUtils.is_notification(message_content):
             notification = NotificationMessage()
             notification.assign_message_content(message_content)
             self.logger.log_message(notification)
@@ -74,7 +143,15 @@ class KvLangServer(object):
             self.request_procedures.get(request.method, self.default_request)(request)
 
     def run(self):
-        """Start server for processing input from stdin."""
+        """Start server for processing input from stdin.
+
+        Server is running under profiler when profile mode is enabled.
+
+        """
+        return self.profiler.runcall(self.process)
+
+    def process(self):
+        """Process input from stdin until exit notification."""
         self.server_status = self.RUNNING
         while True:
             if self.server_status == self.EXIT_SUCCESS:
@@ -83,16 +160,44 @@ class KvLangServer(object):
                 return self.EXIT_ERROR
             else:
                 line_with_content = self.reader.readline()
-                self.handle(line_with_content)
+                if not line_with_content:
+                    # Client closed input without exit notification
+                    return self.EXIT_ERROR
+                # Workspace scan update graph between messages
+                with self.lock:
+                    self.handle(line_with_content)
 
     def initialize(self, request):
         """Handle Initialize Request."""
+        params = request.params or dict()
+        self.client_capabilities = params.get("capabilities") or dict()
+        if params.get("rootUri"):
+            self.root_path = uri_to_path(params["rootUri"])
+        elif params.get("rootPath"):
+            self.root_path = params["rootPath"]
+        self.folders = [uri_to_path(folder["uri"]) or folder["uri"]
+                        for folder in params.get("workspaceFolders") or ()]
+        if not self.folders and self.root_path:
+            self.folders = [self.root_path]
+        self.workspace.set_root(self.root_path, self.folders)
+        self.configure(dict())
         message = ResponseMessage()
         message.content({'capabilities': {'textDocumentSync': {'openClose': True,
-                                                               'change': 0,
+                                                               'change': 1,
                                                                'willSave': False,
                                                                'willSaveWaitUntil': False,
                                                                'save': {'includeText': True}},
+                                          'semanticTokensProvider': {
+                                              'documentSelector': [{'language': 'kv'}],
+                                              'legend': LEGEND,
+                                              'full': {'delta': True},
+                                              'range': True},
+                                          'workspaceSymbolProvider': {'workDoneProgress': True},
+                                          'foldingRangeProvider': {
+                                              'documentSelector': [{'language': 'kv'}]},
+                                          'selectionRangeProvider': {
+                                              'documentSelector': [{'language': 'kv'}]},
+                                          'hoverProvider': True,
                                           #TODO 'completionProvider': {'resolveProvider': True}
                                           }}, True, request.request_id)
         self.send(message)
@@ -104,20 +209,202 @@ class KvLangServer(object):
             message.content({'type': MessageType.INFO, 'message': self.kvlint.KIVY_IMPORT_MSG},
                             'window/logMessage')
             self.send(message)
+        self.request_configuration()
+        self.scan_thread = threading.Thread(target=self.scan, args=(list(self.folders),))
+        self.scan_thread.daemon = True
+        self.scan_thread.start()
 
-    def did_save(self, notification):
-        """Handle DidSaveTextDocument Notification."""
-        document = self.document_manager.get(notification.params["textDocument"]["uri"])
-        document.text = notification.params["text"]
-        diagnostic = self.kvlint.parse(document)
+    def scan(self, folders):
+        """Scan workspace folders in the background thread.
+
+        Files are walked and stat without the lock. Every chunk of files is processed under the
+        lock, so requests are not stalled until the whole workspace is scanned.
+
+        """
+        for stamps in self.scanner.stamps(folders):
+            with self.lock:
+                self.publish_keys(self.scanner.update(stamps))
+
+    def request_configuration(self):
+        """Request KvLint settings and python path of every workspace folder.
+
+        Request is sent only when client support workspace/configuration request. Return True
+        when request was sent.
+
+        """
+        workspace = self.client_capabilities.get("workspace") or dict()
+        if not workspace.get("configuration"):
+            return False
+        items = [{'section': 'kvlang.lint'}]
+        for folder in self.folders:
+            items.append({'scopeUri': path_to_uri(folder), 'section': 'kvlang.lint'})
+            items.append({'scopeUri': path_to_uri(folder), 'section': 'kvlang.pythonPath'})
+        self.request("workspace/configuration", {'items': items}, self.configuration)
+        return True
+
+    def configuration(self, response):
+        """Handle response to the workspace/configuration request.
+
+        Result contain KvLint settings without scope followed by KvLint settings and python path
+        of every workspace folder.
+
+        """
+        if response.error is None and response.result:
+            result = response.result
+            folders = list(zip(self.folders, result[1::2], result[2::2]))
+            self.configure(result[0], dict((folder, settings)
+                                           for folder, settings, _ in folders))
+            self.interpreters = dict((folder, python_path)
+                                     for folder, _, python_path in folders if python_path)
+            self.publish_all()
+
+    def did_change_configuration(self, notification):
+        """Handle DidChangeConfiguration Notification.
+
+        Settings scoped to the workspace folders are requested again when client support it and
+        documents are linted once after response. Otherwise pushed settings, which are not
+        scoped, are used for all folders.
+
+        """
+        if self.request_configuration():
+            return
+        settings = (notification.params or dict()).get("settings")
+        if isinstance(settings, dict) and isinstance(settings.get("kvlang"), dict):
+            self.configure(settings["kvlang"].get("lint"))
+            python_path = settings["kvlang"].get("pythonPath")
+            if python_path:
+                self.interpreters = dict((folder, python_path) for folder in self.folders)
+            self.publish_all()
+
+    @staticmethod
+    def folder(uri, folders):
+        """Return the innermost folder which contain the document or None."""
+        path = uri_to_path(uri) or uri
+        folders = [folder for folder in folders
+                   if path == folder or path.startswith(os.path.join(folder, ""))]
+        return max(folders, key=len) if folders else None
+
+    def interpreter(self, uri):
+        """Return python path configured for the workspace folder of the document."""
+        return self.interpreters.get(self.folder(uri, self.interpreters))
+
+    def worker(self, uri):
+        """Return worker of the interpreter configured for the document or None."""
+        return self.workers.get(self.interpreter(uri))
+
+    def parse_exception(self, document, beginning_index):
+        """Parse document by Kivy of the interpreter configured for its workspace folder.
+
+        Document is parsed in the server when interpreter is the same or worker failed.
+
+        """
+        worker = self.worker(document.uri)
+        if worker is None:
+            return parse_exception(document, beginning_index)
+        try:
+            result = worker.call("parse", {'text': document.text})
+        except WorkerException as exception:
+            self.logger.log(Logger.INFO, str(exception))
+            return parse_exception(document, beginning_index)
+        if result is None:
+            return None
+        # Worker parse region without its prefix. First line of the region is shifted.
+        shift = document.cached("lines", line_index).shift
+        start = result["range"]["start"]
+        end = result["range"]["end"]
+        return Diagnostic(Range(Position(beginning_index + start["line"],
+                                         start["character"] + (shift if start["line"] == 0 else 0)),
+                                Position(beginning_index + end["line"],
+                                         end["character"] + (shift if end["line"] == 0 else 0))),
+                          result["message"])
+
+    def expressions(self, document):
+        """Return analyzed expressions by Python of the interpreter configured for the document.
+
+        Result is cached with the document per interpreter. Expressions are analyzed in the
+        server when interpreter is the same or worker failed.
+
+        """
+        worker = self.worker(document.uri)
+        if worker is None:
+            return document.cached("expressions", analyze)
+        return document.cached(("expressions", worker.executable),
+                               lambda region: self.analyze(region, worker))
+
+    def analyze(self, document, worker):
+        """Return analyzed expressions of the document by the worker."""
+        try:
+            results = worker.call("expressions", {'text': document.text})
+        except WorkerException as exception:
+            self.logger.log(Logger.INFO, str(exception))
+            return analyze(document)
+        # Worker analyze text of the region from its first line
+        return [(document.beginning_index + line, start, end, message, error)
+                for line, start, end, message, error in results]
+
+    def expression_exception(self, document, _):
+        """Check if property values are valid expressions of the document interpreter."""
+        return expression_diagnostics(document, self.expressions(document), True)
+
+    def undefined_name(self, document, _):
+        """Check if names used in property values are defined."""
+        return expression_diagnostics(document, self.expressions(document), False)
+
+    def configure(self, settings, folder_settings=None):
+        """Configure KvLint with .kvlintrc overridden by client settings.
+
+        Every workspace folder has configuration from its own .kvlintrc and folder settings.
+        Settings without scope are used for folders without their own settings. Configuration of
+        the root path is used for documents outside of the workspace folders. Execution plan of
+        every folder configuration is compiled once.
+
+        """
+        folder_settings = folder_settings or dict()
+        self.kvlint.configure(LintConfig().update(load_kvlintrc(self.root_path)).update(settings))
+        self.configs = dict((folder, LintConfig().update(load_kvlintrc(folder)).update(
+            folder_settings.get(folder, settings))) for folder in self.folders)
+        self.plans = dict((folder, self.kvlint.compile(config))
+                          for folder, config in self.configs.items())
+
+    def publish(self, document):
+        """Lint document with configuration of its workspace folder and publish diagnostics."""
+        folder = self.folder(document.uri, self.configs)
+        diagnostic = self.kvlint.parse(document, self.configs.get(folder), self.plans.get(folder))
         message = NotificationMessage()
         message.content({'uri': document.uri, 'diagnostics': diagnostic},
                         'textDocument/publishDiagnostics')
         self.send(message)
 
+    def publish_dependents(self, document):
+        """Update dependency graph and relint opened documents which include the document."""
+        self.publish_keys(self.workspace.update(document))
+
+    def publish_keys(self, keys):
+        """Relint opened documents with the keys of the dependency graph."""
+        if not keys:
+            return
+        for uri in list(self.document_manager.documents):
+            if Workspace.key(uri) in keys:
+                self.publish(self.document_manager.get(uri))
+
+    def publish_all(self):
+        """Lint and publish diagnostics of all documents opened in the manager."""
+        for uri in list(self.document_manager.documents):
+            self.publish(self.document_manager.get(uri))
+
+    def did_save(self, notification):
+        """Handle DidSaveTextDocument Notification."""
+        document = self.document_manager.get(notification.params["textDocument"]["uri"])
+        document.text = notification.params["text"]
+        self.publish(document)
+        self.publish_dependents(document)
+
     def did_change(self, notification):
-        """Handle DidChangeTextDocument Notification."""
-        pass
+        """Handle DidChangeTextDocument Notification. Full content of the document is synced."""
+        document = self.document_manager.get(notification.params["textDocument"]["uri"])
+        changes = notification.params["contentChanges"]
+        if changes:
+            document.text = changes[-1]["text"]
 
     def did_open(self, notification):
         """Handle DidOpenTextDocumentParams Notification."""
@@ -125,21 +412,124 @@ class KvLangServer(object):
                                     notification.params["textDocument"]["languageId"],
                                     notification.params["textDocument"]["text"])
         self.document_manager.add(document)
-        diagnostic = self.kvlint.parse(document)
-        message = NotificationMessage()
-        message.content({'uri': document.uri, 'diagnostics': diagnostic},
-                        'textDocument/publishDiagnostics')
-        self.send(message)
+        self.publish(document)
+        self.publish_dependents(document)
 
     def did_close(self, notification):
         """Handle DidCloseTextDocumentParams Notification."""
         # Clear diagnostic
         self.document_manager.remove(notification.params["textDocument"]["uri"])
+        # Dependency graph follow the file stored on the disk again
+        path = Workspace.key(notification.params["textDocument"]["uri"])
+        self.publish_keys(self.scanner.process(*file_stamp(path), force=True))
         message = NotificationMessage()
         message.content({'uri': notification.params["textDocument"]["uri"],
                          'diagnostics': []}, 'textDocument/publishDiagnostics')
         self.send(message)
 
+    def did_change_watched_files(self, notification):
+        """Handle DidChangeWatchedFiles Notification. Opened documents are synced by client.
+
+        Created or deleted Python file can change resolved imports. Imports of the deleted files
+        are forgotten and all opened documents are published.
+
+        """
+        changes = (notification.params or dict()).get("changes") or ()
+        modules = any(change.get("type") in (FileChangeType.CREATED, FileChangeType.DELETED) and
+                      os.path.splitext(change["uri"])[1] == ".py" for change in changes)
+        self.workspace.forget_modules(Workspace.key(change["uri"]) for change in changes
+                                      if change.get("type") == FileChangeType.DELETED)
+        keys = self.scanner.changed([change for change in changes
+                                     if change["uri"] not in self.document_manager.documents])
+        if modules:
+            self.publish_all()
+        else:
+            self.publish_keys(keys)
+
+    def workspace_symbol(self, request):
+        """Handle WorkspaceSymbolParams Request.
+
+        Opened documents are searched first and then files found by the workspace scanner.
+        Symbols are streamed in chunks of files when client send partialResultToken.
+
+        """
+        params = request.params or dict()
+        query = params.get("query") or ""
+        progress = Progress(self.send, params)
+        progress.begin("Searching KvLang symbols")
+        opened = list(self.document_manager.documents)
+        keys = set(Workspace.key(uri) for uri in opened)
+        files = [(path, stamp) for path, (stamp, digest) in sorted(self.scanner.manifest.items())
+                 if digest is not None and path not in keys]
+        self.symbol_index.prune((path for path, _ in files), self.folders)
+        total = len(opened) + len(files)
+        for index, uri in enumerate(opened, 1):
+            document = self.document_manager.get(uri)
+            progress.add(symbol_information(uri, document.cached("symbols", document_symbols),
+                                            query))
+            if index % self.SYMBOL_CHUNK == 0:
+                progress.report(100 * index / total)
+        for index, (path, stamp) in enumerate(files, len(opened) + 1):
+            language_id = LANGUAGES[os.path.splitext(path)[1]]
+            uri, symbols = self.symbol_index.file_symbols(path, stamp, language_id)
+            progress.add(symbol_information(uri, symbols, query))
+            if index % self.SYMBOL_CHUNK == 0:
+                progress.report(100 * index / total)
+        progress.end()
+        message = ResponseMessage()
+        message.content(progress.result, True, request.request_id)
+        self.send(message)
+
+    def folding_range(self, request):
+        """Handle FoldingRangeParams Request."""
+        document = self.document_manager.get(request.params["textDocument"]["uri"])
+        message = ResponseMessage()
+        message.content(document.cached("folding_ranges", folding_ranges), True,
+                        request.request_id)
+        self.send(message)
+
+    def selection_range(self, request):
+        """Handle SelectionRangeParams Request."""
+        document = self.document_manager.get(request.params["textDocument"]["uri"])
+        message = ResponseMessage()
+        message.content([selection_range(document, position)
+                         for position in request.params["positions"]], True, request.request_id)
+        self.send(message)
+
+    def hover(self, request):
+        """Handle HoverParams Request. Docstring of the widget or rule class is shown."""
+        document = self.document_manager.get(request.params["textDocument"]["uri"])
+        result = None
+        name = class_name(document, request.params["position"])
+        if name is not None:
+            docstring = self.docstring(document.uri, name[0])
+            if docstring is not None:
+                result = {'contents': {'kind': 'plaintext', 'value': docstring},
+                          'range': name[1]}
+        message = ResponseMessage()
+        message.content(result, True, request.request_id)
+        self.send(message)
+
+    def docstring(self, uri, name):
+        """Return docstring of the class loaded by Kivy of the interpreter of the document.
+
+        Docstrings are loaded lazily on the first hover of the class and cached per interpreter.
+
+        """
+        executable = self.interpreter(uri)
+        key = (executable, name)
+        if key not in self.docstrings:
+            worker = self.workers.get(executable)
+            if worker is None:
+                self.docstrings[key] = class_docstring(name)
+            else:
+                try:
+                    self.docstrings[key] = worker.call("docstring", {'name': name})
+                except WorkerException as exception:
+                    self.logger.log(Logger.INFO, str(exception))
+                    return class_docstring(name)
+        return self.docstrings[key]
+
     def completion(self, request):
         """Handle CompletionParams Request."""
         # TODO Add full support for textDocument/completion with test
@@ -154,6 +544,50 @@ class KvLangServer(object):
         message.content({'isIncomplete': False, 'items': []}, True, request.request_id)
         self.send(message)
 
+    def store_semantic_tokens(self, document):
+        """Store encoded tokens of the document as the base of next delta request.
+
+        Tokens are kept with the document under its memory budget. Full tokens are sent when
+        they were dropped.
+
+        """
+        data = document.cached("semantic_tokens_data", document_data)
+        self.result_id += 1
+        result_id = str(self.result_id)
+        document.keep("semantic_tokens", (result_id, data), len(data))
+        return result_id, data
+
+    def semantic_tokens_full(self, request):
+        """Handle SemanticTokensParams Request."""
+        document = self.document_manager.get(request.params["textDocument"]["uri"])
+        result_id, data = self.store_semantic_tokens(document)
+        message = ResponseMessage()
+        message.content({'resultId': result_id, 'data': data}, True, request.request_id)
+        self.send(message)
+
+    def semantic_tokens_delta(self, request):
+        """Handle SemanticTokensDeltaParams Request."""
+        document = self.document_manager.get(request.params["textDocument"]["uri"])
+        previous_id, previous = document.kept("semantic_tokens") or (None, None)
+        result_id, data = self.store_semantic_tokens(document)
+        message = ResponseMessage()
+        if previous_id is not None and previous_id == request.params["previousResultId"]:
+            message.content({'resultId': result_id, 'edits': delta(previous, data)}, True,
+                            request.request_id)
+        else:
+            message.content({'resultId': result_id, 'data': data}, True, request.request_id)
+        self.send(message)
+
+    def semantic_tokens_range(self, request):
+        """Handle SemanticTokensRangeParams Request."""
+        document = self.document_manager.get(request.params["textDocument"]["uri"])
+        tokens = document.cached("semantic_tokens", document_tokens)
+        token_range = request.params["range"]
+        message = ResponseMessage()
+        message.content({'data': encode(tokens, token_range["start"]["line"],
+                                        token_range["end"]["line"])}, True, request.request_id)
+        self.send(message)
+
     def default_request(self, request):
         """Handle unknown request method which do not exist in procedures."""
         self.logger.log(Logger.INFO, "Server do not support request with method='{}'". \
@@ -168,6 +602,16 @@ class KvLangServer(object):
         self.logger.log(Logger.INFO, "Server do not support notification with method='{}'". \
                         format(notification.method))
 
+    def profile(self, message):
+        """Handle profile Request or Notification. Dump statistics collected by profiler."""
+        file_name = self.profiler.dump()
+        self.logger.log(Logger.INFO, "Profile dumped to file='{}'".format(file_name))
+        if isinstance(message, RequestMessage):
+            response = ResponseMessage()
+            response.content({'enabled': self.profiler.profile_mode, 'file': file_name},
+                             True, message.request_id)
+            self.send(response)
+
     def shutdown(self, request):
         """Handle Shutdown Request."""
         message = ResponseMessage()
@@ -1,7 +1,19 @@
 """Simple KvLang linting module to show parser errors."""
 from __future__ import absolute_import
-from kvls.utils import EOL  # pylint: disable=C0413
+import re
+from kvls.utils import LINE_BREAKS, NEWLINE, split_lines  # pylint: disable=C0413
+from kvls.document import line_index
 from kvls.lang import Parser, ParserException, KIVY_IMPORTED, KIVY_IMPORT_MSG
+from kvls.protocol import Diagnostic
+from kvls.config import LintConfig
+from kvls.expression import expression_exception, undefined_name
+
+# Patterns of diagnostic I001 keyed by maximum line length. Cache is cleared when it is full.
+LINE_TO_LONG_PATTERNS = dict()
+LINE_TO_LONG_PATTERNS_SIZE = 16
+TRAILING_WHITESPACE = re.compile(u"[^\\S{0}]+(?=[{0}]|$)".format(LINE_BREAKS))
+# Line breaks of str.splitlines which are not line breaks of the language server protocol
+KIVY_LINE_BREAKS = re.compile(u"[\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
 
 class Severity(object):
     """Data class of the lint result.
@@ -38,18 +50,25 @@ class KvLint(object):
         SOURCE: A human-readable string describing the source of diagnostic.
         CODE: The diagnostic's code, which might appear in the user interface.
 
-    KvLint diagnostic result dictionary contains
-        'range' Contains line and position of start and end character.
-            'start'
-                'line'
-                'character'
-            'end'
-                'line'
-                'character'
-        'severity' Severity of the lint result.
-        'code' Diagnostic code.
-        'source' What source performed linting. Default to 'KvLint'.
-        'message' KvLint message
+    KvLint diagnostic result is protocol.Diagnostic object which contains
+        range: Contains line and position of start and end character.
+        severity: Severity of the lint result.
+        code: Diagnostic code.
+        source: What source performed linting. Default to 'KvLint'.
+        message: KvLint message
+
+    Registered methods return Diagnostic with range and message only. Severity, code and source
+    are assigned by KvLint. Methods are registered as:
+        single line: Called for every line of the document.
+        whole buffer: Called once with full text, LineIndex and LintConfig. Return list of
+            diagnostics. Preferred for rules which can be expressed as regular expression.
+        full document: Called once with document. Return diagnostic, list of diagnostics
+            or None.
+
+    Registered methods are compiled by configure into the execution plan. Methods disabled in
+    LintConfig are not part of the plan and are never called. Document can be parsed with other
+    configuration e.g. configuration of its workspace folder. Plan of such configuration should
+    be compiled once by compile and passed with it, otherwise it is compiled on every parse.
 
     """
 
@@ -57,119 +76,175 @@ class KvLint(object):
     KIVY_IMPORTED = KIVY_IMPORTED
     KIVY_IMPORT_MSG = KIVY_IMPORT_MSG
 
-    def __init__(self):
+    def __init__(self, config=None):
         """Initialize KvLint object."""
+        self.config = config or LintConfig()
+        self.plan = None
         self.single_line = dict()
+        self.whole_buffer = dict()
         self.full_document = dict()
-        self.register_line(line_to_long, Severity.INFORMATION, "I001", KvLint.SOURCE)
-        self.register_line(trailing_whitespace, Severity.INFORMATION, "I002", KvLint.SOURCE)
+        self.register_buffer(line_to_long, Severity.INFORMATION, "I001", KvLint.SOURCE)
+        self.register_buffer(trailing_whitespace, Severity.INFORMATION, "I002", KvLint.SOURCE)
 
         self.register_document(newline_missing, Severity.INFORMATION, "I003", KvLint.SOURCE)
         self.register_document(trailing_newline, Severity.INFORMATION, "I004", KvLint.SOURCE)
         self.register_document(parse_exception, Severity.ERROR, "E001", KvLint.SOURCE)
+        self.register_document(expression_exception, Severity.ERROR, "E004", KvLint.SOURCE)
+        self.register_document(undefined_name, Severity.WARNING, "W002", KvLint.SOURCE)
 
     def register_line(self, method, severity, code, source):
         """Register single line diagnostic."""
         self.single_line[code] = (method, severity, source)
+        self.plan = None
+
+    def register_buffer(self, method, severity, code, source):
+        """Register whole buffer diagnostic."""
+        self.whole_buffer[code] = (method, severity, source)
+        self.plan = None
 
     def register_document(self, method, severity, code, source):
         """Register full document diagnostic."""
         self.full_document[code] = (method, severity, source)
+        self.plan = None
+
+    def compile(self, config):
+        """Return execution plan of the diagnostics enabled in the configuration."""
+        return tuple(tuple((code, method, severity, source)
+                           for code, (method, severity, source) in sorted(rules.items())
+                           if config.enabled(code))
+                     for rules in (self.single_line, self.whole_buffer, self.full_document))
+
+    def configure(self, config):
+        """Compile enabled diagnostics of the default configuration into the execution plan."""
+        self.config = config
+        self.plan = self.compile(config)
+
+    def parse(self, document, config=None, plan=None):
+        """Run all enabled diagnostic in the KvLint for every KvLang region of the document.
+
+        Default configuration is used when config is not passed. Plan is compiled from config
+        when it is not passed.
 
-    def parse(self, document):
-        """Run all available diagnostic in the KvLint."""
+        """
+        if config is None or config is self.config:
+            if self.plan is None:
+                self.configure(self.config)
+            config, plan = self.config, self.plan
+        elif plan is None:
+            plan = self.compile(config)
         diagnostics = []
-        line_index = 0
-        beginning_index = document.beginning_index
-        for line in document.text.splitlines():
-            for code, values in self.single_line.items():
-                method, severity, source = values
-                diagnostic = method(line, beginning_index + line_index)
-                if diagnostic:
-                    diagnostics.append({'range': diagnostic["range"],
-                                        'severity': severity, 'code': code,
-                                        'source': source, 'message': diagnostic["message"]})
-            line_index += 1
-        for code, values in self.full_document.items():
-            method, severity, source = values
-            diagnostic = method(document, beginning_index)
-            if diagnostic:
-                diagnostics.append({'range': diagnostic["range"],
-                                    'severity': severity, 'code': code,
-                                    'source': source, 'message': diagnostic["message"]})
+        for region in document.regions:
+            diagnostics.extend(self.parse_region(region, plan, config))
         return diagnostics
 
-def line_to_long(line, line_index):
-    """Check if line is not to long."""
-    length = len(line)
-    if length >= 110:
-        return {'range': {'start': {'line': line_index,
-                                    'character': 0},
-                          'end': {'line': line_index,
-                                  'character': 0}},
-                'message': "Line to long ({},{})".format(length, 110)}
-    return None
+    @staticmethod
+    def parse_region(document, plan, config):
+        """Run diagnostics of the execution plan for single KvLang region."""
+        single_line, whole_buffer, full_document = plan
+        diagnostics = []
+        line_number = 0
+        beginning_index = document.beginning_index
+        text = document.text
+        lines = document.cached("lines", line_index)
+        for code, method, severity, source in whole_buffer:
+            for diagnostic in method(text, lines, config):
+                diagnostic.severity = severity
+                diagnostic.code = code
+                diagnostic.source = source
+                diagnostics.append(diagnostic)
+        for line in split_lines(text) if single_line else ():
+            for code, method, severity, source in single_line:
+                diagnostic = method(line, beginning_index + line_number)
+                if diagnostic is not None:
+                    diagnostic.severity = severity
+                    diagnostic.code = code
+                    diagnostic.source = source
+                    diagnostics.append(diagnostic)
+            line_number += 1
+        for code, method, severity, source in full_document:
+            result = method(document, beginning_index)
+            if result is None:
+                continue
+            for diagnostic in result if isinstance(result, list) else (result,):
+                diagnostic.severity = severity
+                diagnostic.code = code
+                diagnostic.source = source
+                diagnostics.append(diagnostic)
+        return diagnostics
 
-def trailing_whitespace(line, line_index):
-    """Check if line contain trailing whitespace."""
-    length = len(line)
-    if length >= 1:
-        if line[length-1].isspace():
-            return {'range': {'start': {'line': line_index,
-                                        'character': 0},
-                              'end': {'line': line_index,
-                                      'character': 0}},
-                    'message': "Trailing whitespace"}
-    return None
+def line_to_long(text, lines, config=LintConfig()):
+    """Find lines which are to long."""
+    max_line_length = config.max_line_length
+    pattern = LINE_TO_LONG_PATTERNS.get(max_line_length)
+    if pattern is None:
+        pattern = re.compile(u"(?:^|(?<=[{0}]))[^{0}]{{{1},}}".format(LINE_BREAKS,
+                                                                      max_line_length))
+        if len(LINE_TO_LONG_PATTERNS) >= LINE_TO_LONG_PATTERNS_SIZE:
+            LINE_TO_LONG_PATTERNS.clear()
+        LINE_TO_LONG_PATTERNS[max_line_length] = pattern
+    return [Diagnostic(lines.span(match.start() + max_line_length, match.end()),
+                       "Line to long ({},{})".format(match.end() - match.start(),
+                                                     max_line_length))
+            for match in pattern.finditer(text)]
+
+def trailing_whitespace(text, lines, _=None):
+    """Find lines which contain trailing whitespace."""
+    return [Diagnostic(lines.span(match.start(), match.end()), "Trailing whitespace")
+            for match in TRAILING_WHITESPACE.finditer(text)]
 
 def newline_missing(document, beginning_index):
     """Check if document contain newline."""
-    lines = document.text.splitlines(True)
+    lines = split_lines(document.text, True)
     length = len(lines)
     if length >= 1:
-        if lines[length-1].find(EOL) == -1:
-            return {'range': {'start': {'line': beginning_index + length-1,
-                                        'character': 0},
-                              'end': {'line': beginning_index + length-1,
-                                      'character': 0}},
-                    'message': "Final newline missing"}
+        if lines[length-1].rstrip(LINE_BREAKS) == lines[length-1]:
+            end = len(lines[length-1])
+            return Diagnostic(document.cached("lines", line_index).range(
+                beginning_index + length-1, end, end), "Final newline missing")
     return None
 
 def trailing_newline(document, beginning_index):
     """Check if document contain trailing newline."""
-    lines = document.text.splitlines(True)
+    lines = split_lines(document.text, True)
     length = len(lines)
     if length >= 1:
-        if lines[length-1].find(EOL) != -1 and lines[length-1].isspace():
-            return {'range': {'start': {'line': beginning_index + length-1,
-                                        'character': 0},
-                              'end': {'line': beginning_index + length-1,
-                                      'character': 0}},
-                    'message': "Trailing newlines"}
+        end = len(lines[length-1].rstrip(LINE_BREAKS))
+        if end < len(lines[length-1]) and lines[length-1].isspace():
+            return Diagnostic(document.cached("lines", line_index).range(
+                beginning_index + length-1, 0, end), "Trailing newlines")
     return None
 
+def kivy_line(text, line):
+    """Return line of the text for the line index reported by Kivy parser.
+
+    Kivy split text by str.splitlines, so form feed and other line breaks which are not line
+    breaks of the language server protocol start new line in Kivy.
+
+    """
+    if KIVY_LINE_BREAKS.search(text) is None:
+        return line
+    offset = sum(len(kivy_text) for kivy_text in text.splitlines(True)[:line])
+    return len(NEWLINE.findall(text, 0, offset))
+
 def parse_exception(document, beginning_index):
-    """Parse document to catch ParserException from Kivy parser."""
+    """Parse document to catch ParserException from Kivy parser.
+
+    Kivy report only line of the error. Range cover content of the line.
+
+    """
     try:
         KvParser(content=document.text)
         # Diagnostic are clear. List will not be updated
     except ParserException as exception:
-        return {'range': {'start': {'line': beginning_index + exception.line,
-                                    'character': 0},
-                          'end': {'line': beginning_index + exception.line,
-                                  'character': 0}},
-                'message': exception.args[0].split('...')[2].strip()}
+        return Diagnostic(document.cached("lines", line_index).content(
+            beginning_index + kivy_line(document.text, exception.line)),
+                          exception.args[0].split('...')[2].strip())
     except SyntaxError as exception:
-        return {'range': {'start': {'line': beginning_index + exception.lineno - 1,
-                                    'character': 0},
-                          'end': {'line': beginning_index + exception.lineno - 1,
-                                  'character': 0}},
-                'message': str(exception.args[0])}
+        return Diagnostic(document.cached("lines", line_index).content(
+            beginning_index + kivy_line(document.text, exception.lineno - 1)),
+                          str(exception.args[0]))
     except BaseException as exception:
-        return {'range': {'start': {'line': beginning_index + 0,
-                                    'character': 0},
-                          'end': {'line': beginning_index + 0,
-                                  'character': 0}},
-                'message': "Kivy parser exception: " + str(exception)}
+        return Diagnostic(document.cached("lines", line_index).range(beginning_index, 0, 0),
+                          "Kivy parser exception: " + str(exception))
 
     return None
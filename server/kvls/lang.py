@@ -1,5 +1,6 @@
 """Module import kivy Parser is available. Otherwise fake class is created."""
 from __future__ import absolute_import
+import inspect
 import os
 # Disable stdout printout from kivy
 os.environ["KIVY_NO_FILELOG"] = "1"
@@ -27,3 +28,19 @@ except ImportError:
         """Fake class when import can't be done of kivy module."""
 
         pass
+
+def class_docstring(name):
+    """Return qualified name and docstring of the class registered in Kivy Factory or None.
+
+    Module of the class is imported by Factory on the first request of the class.
+
+    """
+    if not KIVY_IMPORTED:
+        return None
+    from kivy.factory import Factory
+    try:
+        cls = Factory.get(name)
+    except Exception: # pylint: disable=W0703
+        # Unknown class or error during import of its module
+        return None
+    return "{}.{}\n\n{}".format(cls.__module__, cls.__name__, inspect.getdoc(cls) or "").strip()
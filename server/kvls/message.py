@@ -7,6 +7,7 @@ from __future__ import absolute_import
 import re
 import json
 from kvls.utils import EOL_LSP, CHARSET
+from kvls.protocol import dumps
 
 class MessageUtils(object):
     """Helper class for processing message information."""
@@ -35,21 +36,36 @@ class MessageUtils(object):
         """Check is message from client is notification."""
         return content.get("id", None) is None
 
+    @staticmethod
+    def is_response(content):
+        """Check is message from client is response to the request sent by server."""
+        return "method" not in content and content.get("id", None) is not None
+
 class Message(object):
-    """Base class of the language server protocol specification."""
+    """Base class of the language server protocol specification.
+
+    Content of the message is stored in slots and converted to JSON only when message is built.
+
+    """
+
+    __slots__ = ("jsonrpc",)
 
     def __init__(self):
         """Initialize base message object."""
-        self.message_content = dict()
+        self.jsonrpc = "2.0"
+
+    def serialize(self):
+        """Return JSON compatible content of the message."""
+        return {"jsonrpc": self.jsonrpc}
 
     @property
-    def jsonrpc(self):
-        """Return jsonrpc version."""
-        return self.message_content["jsonrpc"]
+    def message_content(self):
+        """Return full dictionary content of the message."""
+        return self.serialize()
 
     def build(self):
         """Build and return full content of the message."""
-        message_content = json.dumps(self.message_content, separators=(',', ':'))
+        message_content = dumps(self)
         length = len(message_content)
         return 'Content-Length: {}{}Content-Type: ' \
                'application/vscode-jsonrpc; charset={}{}{}{}'. \
@@ -58,70 +74,93 @@ class Message(object):
 class NotificationMessage(Message):
     """Class responsible storing notification message information."""
 
+    __slots__ = ("method", "params")
+
+    def __init__(self):
+        """Initialize notification message object."""
+        super(NotificationMessage, self).__init__()
+        self.method = None
+        self.params = None
+
     def content(self, content, method):
         """Assign content and method to the message."""
-        self.message_content = {"jsonrpc": "2.0", "method": method, "params": content}
+        self.method = method
+        self.params = content
 
     def assign_message_content(self, dict_content):
         """Full dictionary content of the message which will be assigned to notification."""
-        self.message_content = dict_content
-
-    @property
-    def method(self):
-        """Return method name."""
-        return self.message_content["method"]
+        self.jsonrpc = dict_content.get("jsonrpc")
+        self.method = dict_content["method"]
+        self.params = dict_content.get("params")
 
-    @property
-    def params(self):
-        """Return params included in notification."""
-        return self.message_content["params"]
+    def serialize(self):
+        """Return JSON compatible content of the message."""
+        return {"jsonrpc": self.jsonrpc, "method": self.method, "params": self.params}
 
 class ResponseMessage(Message):
     """Class responsible storing response message information."""
 
+    __slots__ = ("request_id", "result", "error")
+
+    def __init__(self):
+        """Initialize response message object."""
+        super(ResponseMessage, self).__init__()
+        self.request_id = None
+        self.result = None
+        self.error = None
+
     def content(self, content, success, request_id):
         """Assign content, request ID, result or error message depends on the success."""
+        self.request_id = request_id
         if success:
-            self.message_content = {"jsonrpc": "2.0", "id": request_id, "result": content}
+            self.result = content
+            self.error = None
         else:
-            self.message_content = {"jsonrpc": "2.0", "id": request_id, "error": content}
+            self.result = None
+            self.error = content
 
-    @property
-    def request_id(self):
-        """Return id of the request."""
-        return self.message_content["id"]
-
-    @property
-    def result(self):
-        """Return result included in response."""
-        return self.message_content["result"]
-
-    @property
-    def error(self):
-        """Return error included in response."""
-        return self.message_content["error"]
+    def assign_message_content(self, dict_content):
+        """Full dictionary content of the message which will be assigned to response."""
+        self.jsonrpc = dict_content.get("jsonrpc")
+        self.request_id = dict_content["id"]
+        self.result = dict_content.get("result")
+        self.error = dict_content.get("error")
+
+    def serialize(self):
+        """Return JSON compatible content of the message."""
+        if self.error is None:
+            return {"jsonrpc": self.jsonrpc, "id": self.request_id, "result": self.result}
+        return {"jsonrpc": self.jsonrpc, "id": self.request_id, "error": self.error}
 
 class RequestMessage(Message):
     """Class responsible storing request message information."""
 
-    def assign_message_content(self, dict_content):
-        """Full dictionary content of the message which will be assigned to request."""
-        self.message_content = dict_content
+    __slots__ = ("request_id", "method", "params")
 
-    @property
-    def request_id(self):
-        """Return id of the request."""
-        return self.message_content["id"]
-
-    @property
-    def method(self):
-        """Return method name."""
-        return self.message_content["method"]
+    def __init__(self):
+        """Initialize request message object."""
+        super(RequestMessage, self).__init__()
+        self.request_id = None
+        self.method = None
+        self.params = None
+
+    def content(self, content, method, request_id):
+        """Assign content, method and request ID to the message."""
+        self.request_id = request_id
+        self.method = method
+        self.params = content
 
-    @property
-    def params(self):
-        """Return params included in request."""
-        return self.message_content["params"]
+    def assign_message_content(self, dict_content):
+        """Full dictionary content of the message which will be assigned to request."""
+        self.jsonrpc = dict_content.get("jsonrpc")
+        self.request_id = dict_content["id"]
+        self.method = dict_content["method"]
+        self.params = dict_content.get("params")
+
+    def serialize(self):
+        """Return JSON compatible content of the message."""
+        return {"jsonrpc": self.jsonrpc, "id": self.request_id, "method": self.method,
+                "params": self.params}
 
 class ErrorCodes(object):
     """The error constants in case a request fails."""
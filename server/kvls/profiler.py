@@ -0,0 +1,48 @@
+"""Module store simple profiling mechanism of the language server process."""
+from __future__ import absolute_import
+import os
+import cProfile
+
+class Profiler(object):
+    """Simple cProfile wrapper for server performance troubleshooting purpose.
+
+    Profile is written in the pstats format. File can be inspected with module pstats or
+    converted to the flamegraph with external tools e.g. flameprof, snakeviz or gprof2dot.
+
+    """
+
+    ENVIRONMENT_VARIABLE = "KVLS_PROFILE"
+
+    def __init__(self, file_name):
+        """Initialize Profiler."""
+        self.file_name = file_name + ".prof"
+        self.profile_mode = False
+        self.profile = None
+
+    def runcall(self, function):
+        """Run function under cProfile when profile mode is on and dump profile on exit."""
+        if not self.profile_mode:
+            return function()
+        self.profile = cProfile.Profile()
+        try:
+            return self.profile.runcall(function)
+        finally:
+            self.profile.dump_stats(self.file_name)
+
+    def dump(self):
+        """Write statistics collected so far to the file and return its name.
+
+        Method is called during the run. Collecting of statistics is resumed afterwards.
+
+        """
+        if self.profile is None:
+            return None
+        # dump_stats disable profile during creating snapshot of statistics
+        self.profile.dump_stats(self.file_name)
+        self.profile.enable()
+        return self.file_name
+
+    def enable_profile_mode(self, argv):
+        """Set profile mode if PROFILE_MODE arg exist in the argv list or in environment."""
+        self.profile_mode = "PROFILE_MODE" in argv or \
+                            bool(os.environ.get(self.ENVIRONMENT_VARIABLE))
@@ -0,0 +1,75 @@
+"""Module contains progress reporting of the long running requests.
+
+Request params can contain workDoneToken and partialResultToken. Progress of the work and
+chunks of the result are sent as $/progress notifications with these tokens. When partial
+results were sent, final response of the request must contain empty result.
+
+"""
+from __future__ import absolute_import
+from kvls.message import NotificationMessage
+
+class Progress(object):
+    """Progress of the single request.
+
+    Items added to the progress are collected in the chunk. Chunk is sent as partial result when
+    client provided partialResultToken. Otherwise it is kept for the final result.
+
+    """
+
+    def __init__(self, send, params):
+        """Initialize progress with send method of the server and params of the request."""
+        self.send = send
+        self.work_done_token = params.get("workDoneToken")
+        self.partial_result_token = params.get("partialResultToken")
+        self.chunk = []
+        self.items = []
+
+    def notify(self, token, value):
+        """Send $/progress notification."""
+        message = NotificationMessage()
+        message.content({'token': token, 'value': value}, '$/progress')
+        self.send(message)
+
+    def begin(self, title):
+        """Report beginning of the work."""
+        if self.work_done_token is not None:
+            self.notify(self.work_done_token, {'kind': 'begin', 'title': title,
+                                               'cancellable': False, 'percentage': 0})
+
+    def report(self, percentage, message=None):
+        """Send collected chunk and report progress of the work."""
+        self.flush()
+        if self.work_done_token is not None:
+            value = {'kind': 'report', 'percentage': int(percentage)}
+            if message is not None:
+                value['message'] = message
+            self.notify(self.work_done_token, value)
+
+    def end(self, message=None):
+        """Send last chunk and report end of the work."""
+        self.flush()
+        if self.work_done_token is not None:
+            value = {'kind': 'end'}
+            if message is not None:
+                value['message'] = message
+            self.notify(self.work_done_token, value)
+
+    def add(self, items):
+        """Add items of the result to the chunk."""
+        self.chunk.extend(items)
+
+    def flush(self):
+        """Send chunk as partial result or keep it for the final result."""
+        if not self.chunk:
+            return
+        if self.partial_result_token is not None:
+            self.notify(self.partial_result_token, self.chunk)
+        else:
+            self.items.extend(self.chunk)
+        self.chunk = []
+
+    @property
+    def result(self):
+        """Return final result of the request. Result is empty when it was sent partially."""
+        self.flush()
+        return self.items
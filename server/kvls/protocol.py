@@ -0,0 +1,134 @@
+"""Module contains compact structures of the language server protocol.
+
+Structures are plain objects with __slots__. Conversion to the JSON compatible representation
+is done only during serialization of the message.
+
+"""
+from __future__ import absolute_import
+import json
+from array import array
+
+class Position(object):
+    """Position in a text document expressed as zero-based line and character offset."""
+
+    __slots__ = ("line", "character")
+
+    def __init__(self, line, character):
+        """Initialize position."""
+        self.line = line
+        self.character = character
+
+    def serialize(self):
+        """Return JSON compatible representation of the position."""
+        return {'line': self.line, 'character': self.character}
+
+class Range(object):
+    """A range in a text document expressed as start and end positions."""
+
+    __slots__ = ("start", "end")
+
+    def __init__(self, start, end):
+        """Initialize range."""
+        self.start = start
+        self.end = end
+
+    def serialize(self):
+        """Return JSON compatible representation of the range."""
+        start = self.start
+        end = self.end
+        return {'start': {'line': start.line, 'character': start.character},
+                'end': {'line': end.line, 'character': end.character}}
+
+class Diagnostic(object):
+    """Represents a diagnostic, such as a compiler error or warning."""
+
+    __slots__ = ("range", "severity", "code", "source", "message")
+
+    def __init__(self, diagnostic_range, message, severity=None, code=None, source=None):
+        """Initialize diagnostic."""
+        self.range = diagnostic_range
+        self.severity = severity
+        self.code = code
+        self.source = source
+        self.message = message
+
+    def serialize(self):
+        """Return JSON compatible representation of the diagnostic."""
+        return {'range': self.range.serialize(), 'severity': self.severity, 'code': self.code,
+                'source': self.source, 'message': self.message}
+
+class SymbolInformation(object):
+    """Represents information about programming constructs like rules, widgets and ids."""
+
+    __slots__ = ("name", "kind", "uri", "range", "container_name")
+
+    def __init__(self, name, kind, uri, symbol_range, container_name=None):
+        """Initialize symbol information."""
+        self.name = name
+        self.kind = kind
+        self.uri = uri
+        self.range = symbol_range
+        self.container_name = container_name
+
+    def serialize(self):
+        """Return JSON compatible representation of the symbol information."""
+        symbol = {'name': self.name, 'kind': self.kind,
+                  'location': {'uri': self.uri, 'range': self.range.serialize()}}
+        if self.container_name is not None:
+            symbol['containerName'] = self.container_name
+        return symbol
+
+class FoldingRange(object):
+    """Represents a folding range of the lines e.g. rule with its widgets or imports."""
+
+    __slots__ = ("start_line", "end_line", "kind")
+
+    def __init__(self, start_line, end_line, kind=None):
+        """Initialize folding range."""
+        self.start_line = start_line
+        self.end_line = end_line
+        self.kind = kind
+
+    def serialize(self):
+        """Return JSON compatible representation of the folding range."""
+        folding = {'startLine': self.start_line, 'endLine': self.end_line}
+        if self.kind is not None:
+            folding['kind'] = self.kind
+        return folding
+
+class SelectionRange(object):
+    """Represents a selection range and its parent range which contain it."""
+
+    __slots__ = ("range", "parent")
+
+    def __init__(self, selection_range, parent=None):
+        """Initialize selection range."""
+        self.range = selection_range
+        self.parent = parent
+
+    def serialize(self):
+        """Return JSON compatible representation of the selection range."""
+        selection = {'range': self.range.serialize()}
+        if self.parent is not None:
+            selection['parent'] = self.parent.serialize()
+        return selection
+
+def line_range(line, start=0, end=0):
+    """Return range placed in the single line."""
+    return Range(Position(line, start), Position(line, end))
+
+def serialize(structure):
+    """Return JSON compatible representation of the protocol structure."""
+    if isinstance(structure, array):
+        return structure.tolist()
+    method = getattr(structure, "serialize", None)
+    if method is None:
+        raise TypeError("Object of type {} is not JSON serializable".
+                        format(type(structure).__name__))
+    return method()
+
+ENCODER = json.JSONEncoder(separators=(',', ':'), default=serialize)
+
+def dumps(content):
+    """Serialize content to the JSON formatted string."""
+    return ENCODER.encode(content)
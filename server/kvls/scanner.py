@@ -0,0 +1,151 @@
+"""Module contains scanning of the workspace files which are not opened in the client.
+
+Initial scan stat all .kv and .py files of the workspace folders in parallel. Content is mapped
+to the memory with mmap and Python files without KvLang are skipped by the byte search before
+decoding. Manifest of the file stamps and content hashes keep result of the scan, so only
+changed files are processed again after workspace/didChangeWatchedFiles notification. Files are
+stat in chunks, so server can scan in the background and update its graph between messages.
+
+"""
+from __future__ import absolute_import
+import hashlib
+import mmap
+import os
+from contextlib import closing
+from multiprocessing.pool import ThreadPool
+from kvls.document import TextDocumentItem, LanguageId
+from kvls.utils import CHARSET, path_to_uri
+
+LANGUAGES = {".kv": LanguageId.KVLANG, ".py": LanguageId.PYTHON}
+PYTHON_MARKERS = (b"#<KvLang>", b"load_string")
+IGNORED_DIRECTORIES = frozenset(["__pycache__", "node_modules", "venv", "env", "build", "dist"])
+
+class FileChangeType(object):
+    """Type of the file event in workspace/didChangeWatchedFiles notification."""
+
+    CREATED = 1
+    CHANGED = 2
+    DELETED = 3
+
+def file_stamp(path):
+    """Return path and (mtime, size) of the file. None is returned as stamp of missing file."""
+    try:
+        status = os.stat(path)
+    except OSError:
+        return path, None
+    return path, (status.st_mtime, status.st_size)
+
+def read_content(path, language_id):
+    """Return content of the file as bytes or None when file does not contain KvLang.
+
+    Python file is decoded only when it contain #<KvLang> tag or Builder.load_string call.
+
+    """
+    try:
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return b""
+            with closing(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)) as mapped:
+                if language_id == LanguageId.PYTHON and \
+                   all(mapped.find(marker) == -1 for marker in PYTHON_MARKERS):
+                    return None
+                return mapped[:]
+    except (IOError, OSError, ValueError):
+        return None
+
+class WorkspaceScanner(object):
+    """Keep workspace dependency graph updated from the files stored on the disk.
+
+    Manifest store path of the file and (stamp, digest). Digest is None when file does not
+    contain KvLang. File with the same stamp is not read again. File with the changed stamp and
+    the same digest is not processed again e.g. after touch or checkout of the same content.
+
+    """
+
+    THREADS = 8
+    CHUNK = 256
+
+    def __init__(self, workspace, threads=THREADS):
+        """Initialize scanner of the workspace."""
+        self.workspace = workspace
+        self.threads = threads
+        self.manifest = dict()
+
+    @staticmethod
+    def walk(folder):
+        """Yield .kv and .py files of the folder. Hidden and ignored directories are skipped."""
+        for directory, directories, files in os.walk(folder):
+            directories[:] = [name for name in directories
+                              if not name.startswith(".") and name not in IGNORED_DIRECTORIES]
+            for name in files:
+                if os.path.splitext(name)[1] in LANGUAGES:
+                    yield os.path.join(directory, name)
+
+    def stamps(self, folders):
+        """Yield chunks of (path, stamp) of the folder files. Chunks are processed by update.
+
+        Files are walked and stat in the caller thread without access to the graph. Known files
+        which were not found by walk are stat again at the end, so they are removed when missing.
+
+        """
+        paths = [path for folder in folders if folder for path in self.walk(folder)]
+        pool = ThreadPool(self.threads)
+        try:
+            for index in range(0, len(paths), self.CHUNK):
+                yield pool.map(file_stamp, paths[index:index + self.CHUNK])
+            found = set(paths)
+            known = [path for path in list(self.manifest) if path not in found and
+                     any(path.startswith(os.path.join(folder, "")) for folder in folders)]
+            if known:
+                yield pool.map(file_stamp, known)
+        finally:
+            pool.close()
+            pool.join()
+
+    def update(self, stamps):
+        """Update graph from the chunk of (path, stamp). Return keys of the affected documents."""
+        affected = set()
+        for path, stamp in stamps:
+            affected.update(self.process(path, stamp))
+        return affected
+
+    def scan(self, folders):
+        """Scan all files of the folders. Return keys of the documents affected by changes."""
+        affected = set()
+        for stamps in self.stamps(folders):
+            affected.update(self.update(stamps))
+        return affected
+
+    def process(self, path, stamp, force=False):
+        """Update graph from the file with the stamp. Return keys of the affected documents."""
+        language_id = LANGUAGES.get(os.path.splitext(path)[1])
+        if language_id is None:
+            return set()
+        if stamp is None:
+            if self.manifest.pop(path, None) is None:
+                return set()
+            return self.workspace.remove(path) | set([path])
+        previous_stamp, previous_digest = self.manifest.get(path, (None, None))
+        if stamp == previous_stamp and not force:
+            return set()
+        content = read_content(path, language_id)
+        digest = hashlib.sha1(content).hexdigest() if content is not None else None
+        self.manifest[path] = (stamp, digest)
+        if digest == previous_digest and previous_stamp is not None and not force:
+            return set()
+        if content is None:
+            return self.workspace.remove(path) | set([path])
+        document = TextDocumentItem(path_to_uri(path), language_id,
+                                    content.decode(CHARSET, "replace"))
+        return self.workspace.update(document) | set([path])
+
+    def changed(self, changes):
+        """Process file events of workspace/didChangeWatchedFiles. Return affected keys."""
+        affected = set()
+        for change in changes:
+            path = self.workspace.key(change["uri"])
+            if change.get("type") == FileChangeType.DELETED:
+                affected.update(self.process(path, None))
+            else:
+                affected.update(self.process(*file_stamp(path)))
+        return affected
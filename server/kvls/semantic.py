@@ -0,0 +1,164 @@
+"""Module contains semantic tokens of the KvLang documents.
+
+Tokens are created from the scanned lines of the document and encoded as flat array of
+unsigned integers described in the language server protocol:
+    deltaLine, deltaStartChar, length, tokenType, tokenModifiers
+
+"""
+from __future__ import absolute_import
+import re
+from array import array
+from kvls.syntax import LineKind, document_lines
+from kvls.document import LanguageId, line_index
+
+IDENTIFIER = re.compile("[A-Za-z_]\\w*|[@,]")
+REFERENCE = re.compile("(?<![\\w.])([A-Za-z_]\\w*)\\.")
+
+class TokenType(object):
+    """Semantic token types. Value is the index in the legend."""
+
+    CLASS = 0
+    PROPERTY = 1
+    VARIABLE = 2
+    EVENT = 3
+    KEYWORD = 4
+    COMMENT = 5
+    MACRO = 6
+    NAMESPACE = 7
+
+class TokenModifier(object):
+    """Semantic token modifiers. Value is the bit in the legend."""
+
+    NONE = 0
+    DECLARATION = 1
+
+LEGEND = {'tokenTypes': ["class", "property", "variable", "event", "keyword", "comment",
+                         "macro", "namespace"],
+          'tokenModifiers': ["declaration"]}
+
+def rule_tokens(kv_line, tokens):
+    """Append tokens of the rule names. Names before @ are declarations."""
+    modifier = TokenModifier.DECLARATION
+    for match in IDENTIFIER.finditer(kv_line.name):
+        name = match.group()
+        if name == "@":
+            modifier = TokenModifier.NONE
+        elif name == ",":
+            modifier = TokenModifier.DECLARATION
+        else:
+            tokens.append((kv_line.line, kv_line.start + match.start(), len(name),
+                           TokenType.CLASS, modifier))
+
+def directive_tokens(kv_line, tokens):
+    """Append tokens of the directive e.g. #:import name module or #:set name value."""
+    tokens.append((kv_line.line, kv_line.indent,
+                   kv_line.start + len(kv_line.name) - kv_line.indent,
+                   TokenType.MACRO, TokenModifier.NONE))
+    if kv_line.name not in ("import", "set"):
+        return
+    arguments = kv_line.value.split(None, 1)
+    if arguments:
+        tokens.append((kv_line.line, kv_line.value_start, len(arguments[0]),
+                       TokenType.VARIABLE, TokenModifier.DECLARATION))
+    if len(arguments) == 2 and kv_line.name == "import":
+        module = arguments[1].rstrip()
+        tokens.append((kv_line.line, kv_line.value_start + kv_line.value.find(module, len(
+            arguments[0])), len(module), TokenType.NAMESPACE, TokenModifier.NONE))
+
+def value_tokens(kv_line, ids, tokens):
+    """Append tokens of the ids referenced in the value."""
+    for match in REFERENCE.finditer(kv_line.value):
+        if match.group(1) in ids:
+            tokens.append((kv_line.line, kv_line.value_start + match.start(1),
+                           len(match.group(1)), TokenType.VARIABLE, TokenModifier.NONE))
+
+def tokenize(lines):
+    """Return list of tokens (line, start, length, type, modifiers) of the scanned lines."""
+    ids = set(kv_line.value for kv_line in lines
+              if kv_line.kind == LineKind.PROPERTY and kv_line.name == "id")
+    tokens = []
+    for kv_line in lines:
+        kind = kv_line.kind
+        if kind == LineKind.PROPERTY:
+            name = kv_line.name
+            if name == "id":
+                tokens.append((kv_line.line, kv_line.start, 2, TokenType.KEYWORD,
+                               TokenModifier.NONE))
+                if kv_line.value:
+                    tokens.append((kv_line.line, kv_line.value_start, len(kv_line.value),
+                                   TokenType.VARIABLE, TokenModifier.DECLARATION))
+                continue
+            token_type = TokenType.EVENT if name.startswith("on_") else TokenType.PROPERTY
+            tokens.append((kv_line.line, kv_line.start, len(name), token_type,
+                           TokenModifier.NONE))
+            value_tokens(kv_line, ids, tokens)
+        elif kind == LineKind.VALUE:
+            value_tokens(kv_line, ids, tokens)
+        elif kind == LineKind.WIDGET:
+            tokens.append((kv_line.line, kv_line.start, len(kv_line.name), TokenType.CLASS,
+                           TokenModifier.NONE))
+        elif kind == LineKind.RULE:
+            rule_tokens(kv_line, tokens)
+        elif kind == LineKind.CANVAS:
+            tokens.append((kv_line.line, kv_line.start, len(kv_line.name), TokenType.KEYWORD,
+                           TokenModifier.NONE))
+        elif kind == LineKind.DIRECTIVE:
+            directive_tokens(kv_line, tokens)
+        elif kind == LineKind.COMMENT:
+            tokens.append((kv_line.line, kv_line.start, len(kv_line.value), TokenType.COMMENT,
+                           TokenModifier.NONE))
+    return tokens
+
+def encode(tokens, first_line=None, last_line=None):
+    """Encode tokens placed between first and last line to the relative integer array."""
+    data = array('I')
+    previous_line = 0
+    previous_start = 0
+    for line, start, length, token_type, modifiers in tokens:
+        if first_line is not None and line < first_line:
+            continue
+        if last_line is not None and line > last_line:
+            break
+        if line != previous_line:
+            previous_start = 0
+        data.extend((line - previous_line, start - previous_start, length, token_type,
+                     modifiers))
+        previous_line = line
+        previous_start = start
+    return data
+
+def delta(previous, current):
+    """Return edits which transform previous integer array to the current one."""
+    if previous == current:
+        return []
+    length = min(len(previous), len(current))
+    prefix = 0
+    while prefix < length and previous[prefix] == current[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < length - prefix and previous[-1 - suffix] == current[-1 - suffix]:
+        suffix += 1
+    return [{'start': prefix, 'deleteCount': len(previous) - prefix - suffix,
+             'data': current[prefix:len(current) - suffix]}]
+
+def utf16_tokens(tokens, lines):
+    """Return tokens with start and length in UTF-16 code units of the LineIndex lines."""
+    if not lines.wide:
+        return tokens
+    result = []
+    for line, start, length, token_type, modifiers in tokens:
+        character = lines.character(line, start)
+        result.append((line, character, lines.character(line, start + length) - character,
+                       token_type, modifiers))
+    return result
+
+def document_tokens(document):
+    """Return tokens of the document. Method is used as a document cache builder."""
+    if document.language_id != LanguageId.KVLANG:
+        return []
+    return utf16_tokens(tokenize(document.cached("syntax", document_lines)),
+                        document.cached("lines", line_index))
+
+def document_data(document):
+    """Return encoded tokens of the document. Method is used as a document cache builder."""
+    return encode(document.cached("semantic_tokens", document_tokens))
@@ -0,0 +1,122 @@
+"""Module contains symbols of the KvLang documents used by workspace/symbol request.
+
+Symbols are created from the scanned lines of every KvLang region of the document:
+    rules and dynamic classes e.g. <Widget>: or <MyButton@Button>:
+    root widgets e.g. BoxLayout: without indentation
+    ids e.g. id: my_label
+    constants e.g. #:set padding 10
+
+"""
+from __future__ import absolute_import
+import io
+import os
+import re
+import threading
+from kvls.document import TextDocumentItem, line_index
+from kvls.protocol import SymbolInformation
+from kvls.syntax import LineKind, document_lines
+from kvls.utils import CHARSET, path_to_uri
+
+RULE_NAME = re.compile("[A-Za-z_][\\w.]*")
+
+class SymbolKind(object):
+    """Kind of the symbol. Value is defined in the language server protocol."""
+
+    CLASS = 5
+    VARIABLE = 13
+    CONSTANT = 14
+
+def rule_names(kv_line):
+    """Yield names declared by the rule and their offsets. Base classes after @ are skipped."""
+    offset = kv_line.start
+    for declaration in kv_line.name.split(","):
+        match = RULE_NAME.search(declaration.split("@", 1)[0])
+        if match is not None:
+            yield match.group(), offset + match.start()
+        offset += len(declaration) + 1
+
+def document_symbols(document):
+    """Return list of (name, kind, range, container) of the document.
+
+    Method is used as a document cache builder.
+
+    """
+    symbols = []
+    for region in document.regions:
+        container = None
+        lines = region.cached("lines", line_index)
+        for kv_line in region.cached("syntax", document_lines):
+            if kv_line.kind == LineKind.RULE and kv_line.indent == 0:
+                container = None
+                for name, start in rule_names(kv_line):
+                    container = container or name
+                    symbols.append((name, SymbolKind.CLASS,
+                                    lines.range(kv_line.line, start, start + len(name)), None))
+            elif kv_line.kind == LineKind.WIDGET and kv_line.indent == 0:
+                container = kv_line.name
+                symbols.append((kv_line.name, SymbolKind.CLASS,
+                                lines.range(kv_line.line, kv_line.start,
+                                           kv_line.start + len(kv_line.name)), None))
+            elif kv_line.kind == LineKind.PROPERTY and kv_line.name == "id" and kv_line.value:
+                name = kv_line.value.split()[0]
+                symbols.append((name, SymbolKind.VARIABLE,
+                                lines.range(kv_line.line, kv_line.value_start,
+                                           kv_line.value_start + len(name)), container))
+            elif kv_line.kind == LineKind.DIRECTIVE and kv_line.name == "set" and kv_line.value:
+                name = kv_line.value.split()[0]
+                symbols.append((name, SymbolKind.CONSTANT,
+                                lines.range(kv_line.line, kv_line.value_start,
+                                           kv_line.value_start + len(name)), None))
+    return symbols
+
+def matches(query, name):
+    """Return True when characters of the query are found in the name in the same order."""
+    position = 0
+    name = name.lower()
+    for character in query.lower():
+        position = name.find(character, position) + 1
+        if position == 0:
+            return False
+    return True
+
+def symbol_information(uri, symbols, query):
+    """Return SymbolInformation objects of the symbols matching the query."""
+    return [SymbolInformation(name, kind, uri, symbol_range, container)
+            for name, kind, symbol_range, container in symbols if matches(query, name)]
+
+class SymbolIndex(object):
+    """Symbols of the files stored on the disk. Symbols are cached until stamp of file change.
+
+    Index is shared by all connections of the daemon. Access is guarded by lock.
+
+    """
+
+    def __init__(self):
+        """Initialize index."""
+        self.files = dict()
+        self.lock = threading.Lock()
+
+    def file_symbols(self, path, stamp, language_id):
+        """Return uri and symbols of the file. Symbols are read again only when stamp change."""
+        with self.lock:
+            cached = self.files.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1], cached[2]
+        uri = path_to_uri(path)
+        try:
+            with io.open(path, mode="r", encoding=CHARSET, errors="replace") as file:
+                symbols = document_symbols(TextDocumentItem(uri, language_id, file.read()))
+        except (IOError, OSError):
+            symbols = []
+        with self.lock:
+            self.files[path] = (stamp, uri, symbols)
+        return uri, symbols
+
+    def prune(self, paths, folders=None):
+        """Remove files which are not part of the paths. Files outside of folders are kept."""
+        paths = set(paths)
+        prefixes = tuple(os.path.join(folder, "") for folder in folders or () if folder)
+        with self.lock:
+            for path in [path for path in self.files if path not in paths and
+                         (folders is None or path.startswith(prefixes))]:
+                del self.files[path]
@@ -0,0 +1,107 @@
+"""Module contains lightweight line scanner of the KvLang.
+
+Scanner does not import Kivy. Every not empty line of the KvLang is classified by its
+content. Result of the scanning is used by editor features e.g. semantic tokens.
+
+"""
+from __future__ import absolute_import
+import re
+from kvls.utils import split_lines
+
+LINE = re.compile("(?P<indent>[ \\t]*)(?:"
+                  "#:[^\\S\\r\\n]*(?P<directive>\\w*)(?P<arguments>.*)|"
+                  "(?P<comment>#.*)|"
+                  "[<\\[](?P<rule>[^>\\]]*)[>\\]][^\\S\\r\\n]*:|"
+                  "(?P<name>[A-Za-z_][\\w.]*)[^\\S\\r\\n]*:(?P<value>.*)|"
+                  "(?P<text>\\S.*?))[^\\S\\r\\n]*$")
+
+class LineKind(object):
+    """Kind of the KvLang line.
+
+    Kind explanation:
+        DIRECTIVE: Directive e.g. #:import name module.
+        COMMENT: Comment line.
+        RULE: Rule or template e.g. <Widget>: or [Template@Button]:.
+        WIDGET: Widget or canvas instruction e.g. Button:.
+        CANVAS: Canvas declaration e.g. canvas.before:.
+        PROPERTY: Property with value e.g. text: 'Hello'.
+        VALUE: Continuation of the value from previous lines.
+
+    """
+
+    DIRECTIVE = 1
+    COMMENT = 2
+    RULE = 3
+    WIDGET = 4
+    CANVAS = 5
+    PROPERTY = 6
+    VALUE = 7
+
+class KvLine(object):
+    """Scanned KvLang line.
+
+    Attributes:
+        line: Zero-based line number.
+        indent: Number of indentation characters.
+        kind: LineKind of the line.
+        name: Name of the rule, widget, property or directive.
+        start: Character offset of the name.
+        value: Value of the property, arguments of the directive or text of the line.
+        value_start: Character offset of the value.
+
+    """
+
+    __slots__ = ("line", "indent", "kind", "name", "start", "value", "value_start")
+
+    def __init__(self, line, indent, kind, name, start, value, value_start):
+        """Initialize scanned line."""
+        self.line = line
+        self.indent = indent
+        self.kind = kind
+        self.name = name
+        self.start = start
+        self.value = value
+        self.value_start = value_start
+
+def scan(text, beginning_index=0):
+    """Return list of KvLine objects for every not empty line of the text."""
+    lines = []
+    for line_index, line in enumerate(split_lines(text)):
+        match = LINE.match(line)
+        if match is None or match.end("indent") == len(line):
+            continue
+        indent = match.end("indent")
+        line_index += beginning_index
+        if match.group("directive") is not None:
+            arguments = match.group("arguments")
+            stripped = arguments.lstrip()
+            lines.append(KvLine(line_index, indent, LineKind.DIRECTIVE, match.group("directive"),
+                                match.start("directive"), stripped,
+                                match.start("arguments") + len(arguments) - len(stripped)))
+        elif match.group("comment") is not None:
+            lines.append(KvLine(line_index, indent, LineKind.COMMENT, None, indent,
+                                match.group("comment"), indent))
+        elif match.group("rule") is not None:
+            lines.append(KvLine(line_index, indent, LineKind.RULE, match.group("rule"),
+                                match.start("rule"), None, match.end()))
+        elif match.group("name") is not None:
+            name = match.group("name")
+            value = match.group("value")
+            value_start = match.start("value")
+            stripped = value.lstrip()
+            value_start += len(value) - len(stripped)
+            if name == "canvas" or name.startswith("canvas."):
+                kind = LineKind.CANVAS
+            elif name[0].isupper() and not stripped:
+                kind = LineKind.WIDGET
+            else:
+                kind = LineKind.PROPERTY
+            lines.append(KvLine(line_index, indent, kind, name, indent, stripped, value_start))
+        else:
+            lines.append(KvLine(line_index, indent, LineKind.VALUE, None, indent,
+                                match.group("text"), indent))
+    return lines
+
+def document_lines(document):
+    """Return scanned lines of the document. Method is used as a document cache builder."""
+    return scan(document.text, document.beginning_index)
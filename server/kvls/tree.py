@@ -0,0 +1,178 @@
+"""Module contains indentation tree of the KvLang documents.
+
+Tree is built from the scanned lines of every KvLang region of the document. Every line is a
+node nested under the closest previous line with smaller indentation. Comments are not part of
+the tree. Tree is cached with the document until text change, so folding ranges, selection
+ranges and hover are answered without scanning the document again.
+
+"""
+from __future__ import absolute_import
+from bisect import bisect_right
+from kvls.document import line_index
+from kvls.protocol import FoldingRange, SelectionRange, Position, Range
+from kvls.symbols import RULE_NAME
+from kvls.syntax import LineKind, document_lines
+
+IMPORT_DIRECTIVES = ("import", "include")
+
+class FoldingRangeKind(object):
+    """Kind of the folding range. Value is defined in the language server protocol."""
+
+    IMPORTS = "imports"
+
+class KvNode(object):
+    """Node of the indentation tree.
+
+    Attributes:
+        kv_line: Scanned KvLine of the node.
+        lines: LineIndex of the region which contain the node.
+        parent: Parent KvNode or None for the line without indentation.
+        children: Nested KvNode objects.
+        end_line: Last document line of the node and its nested nodes.
+
+    """
+
+    __slots__ = ("kv_line", "lines", "parent", "children", "end_line")
+
+    def __init__(self, kv_line, lines, parent):
+        """Initialize node of the scanned line."""
+        self.kv_line = kv_line
+        self.lines = lines
+        self.parent = parent
+        self.children = []
+        self.end_line = kv_line.line
+
+    def block_range(self):
+        """Return range from the beginning of the node to the end of its last nested line."""
+        lines = self.lines
+        kv_line = self.kv_line
+        end = len(lines.line_text(self.end_line))
+        return Range(Position(kv_line.line, lines.character(kv_line.line, kv_line.indent)),
+                     Position(self.end_line, lines.character(self.end_line, end)))
+
+class KvTree(object):
+    """Indentation tree of all KvLang regions of the document.
+
+    Attributes:
+        roots: KvNode objects without indentation.
+        nodes: KvNode objects ordered by their line.
+        line_numbers: Lines of the nodes used for bisect.
+
+    """
+
+    __slots__ = ("roots", "nodes", "line_numbers")
+
+    def __init__(self):
+        """Initialize empty tree."""
+        self.roots = []
+        self.nodes = []
+        self.line_numbers = []
+
+    def add(self, region):
+        """Add scanned lines of the region to the tree."""
+        lines = region.cached("lines", line_index)
+        parents = []
+        for kv_line in region.cached("syntax", document_lines):
+            if kv_line.kind == LineKind.COMMENT:
+                continue
+            while parents and parents[-1].kv_line.indent >= kv_line.indent:
+                parents.pop()
+            parent = parents[-1] if parents else None
+            node = KvNode(kv_line, lines, parent)
+            if parent is None:
+                self.roots.append(node)
+            else:
+                parent.children.append(node)
+            for ancestor in parents:
+                ancestor.end_line = kv_line.line
+            parents.append(node)
+            self.nodes.append(node)
+            self.line_numbers.append(kv_line.line)
+
+    def node(self, line):
+        """Return the innermost node which contain the line or None."""
+        index = bisect_right(self.line_numbers, line) - 1
+        if index < 0:
+            return None
+        node = self.nodes[index]
+        while node is not None and node.end_line < line:
+            node = node.parent
+        return node
+
+def document_tree(document):
+    """Return KvTree of the document. Method is used as a document cache builder."""
+    tree = KvTree()
+    for region in document.regions:
+        tree.add(region)
+    return tree
+
+def folding_ranges(document):
+    """Return FoldingRange objects of the nodes with nested lines and of the import blocks.
+
+    Method is used as a document cache builder.
+
+    """
+    ranges = []
+    imports = []
+    for node in document.cached("tree", document_tree).nodes:
+        kv_line = node.kv_line
+        if node.end_line > kv_line.line:
+            ranges.append(FoldingRange(kv_line.line, node.end_line))
+        if kv_line.kind == LineKind.DIRECTIVE and kv_line.name in IMPORT_DIRECTIVES:
+            if imports and imports[-1][1] + 1 == kv_line.line:
+                imports[-1][1] = kv_line.line
+            else:
+                imports.append([kv_line.line, kv_line.line])
+    ranges.extend(FoldingRange(start, end, FoldingRangeKind.IMPORTS)
+                  for start, end in imports if end > start)
+    return ranges
+
+def name_ranges(node):
+    """Yield (name, start, end) character columns of the names and value of the node line."""
+    kv_line = node.kv_line
+    if kv_line.kind == LineKind.RULE:
+        for match in RULE_NAME.finditer(kv_line.name):
+            yield match.group(), kv_line.start + match.start(), kv_line.start + match.end()
+    elif kv_line.name is not None:
+        yield kv_line.name, kv_line.start, kv_line.start + len(kv_line.name)
+    if kv_line.value:
+        yield kv_line.value, kv_line.value_start, kv_line.value_start + len(kv_line.value)
+
+def class_name(document, position):
+    """Return name and range of the widget or rule class at the position or None."""
+    node = document.cached("tree", document_tree).node(position["line"])
+    if node is None or node.kv_line.line != position["line"] or \
+       node.kv_line.kind not in (LineKind.RULE, LineKind.WIDGET):
+        return None
+    column = node.lines.column(node.kv_line.line, position["character"])
+    for name, start, end in name_ranges(node):
+        if start <= column <= end and name[0].isupper():
+            return name, node.lines.range(node.kv_line.line, start, end)
+    return None
+
+def selection_range(document, position):
+    """Return SelectionRange from the name at the position to the top level node.
+
+    Selection expands from the name or value under the cursor to the content of the line and
+    then to the blocks of the node and its parents.
+
+    """
+    line = position["line"]
+    node = document.cached("tree", document_tree).node(line)
+    if node is None:
+        return SelectionRange(Range(Position(line, position["character"]),
+                                    Position(line, position["character"])))
+    ranges = []
+    if node.kv_line.line == line:
+        column = node.lines.column(line, position["character"])
+        ranges.extend(node.lines.range(line, start, end)
+                      for _, start, end in name_ranges(node) if start <= column <= end)
+        ranges.append(node.lines.content(line))
+    while node is not None:
+        ranges.append(node.block_range())
+        node = node.parent
+    selection = None
+    for child_range in reversed(ranges):
+        if selection is None or child_range.serialize() != selection.range.serialize():
+            selection = SelectionRange(child_range, selection)
+    return selection
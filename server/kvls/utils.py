@@ -1,6 +1,12 @@
 """Utils module store variables and function used in cross platform systems."""
 from __future__ import absolute_import
 import os
+import re
+try:
+    from urllib.parse import urlparse, unquote, quote
+except ImportError:
+    from urlparse import urlparse
+    from urllib import unquote, quote
 
 EOL_POSIX = '\n'
 EOL_WIN = '\r\n'
@@ -12,5 +18,44 @@ EOL_LSP = EOL_LSP_WIN if os.name != "posix" else EOL_LSP_POSIX
 
 CHARSET = "utf-8"
 
+# Line breaks of the language server protocol. Used for all line numbers sent to client.
+LINE_BREAKS = "\r\n"
+NEWLINE = re.compile("\r\n|\r|\n")
+SPLIT_LINES = re.compile("(\r\n|\r|\n)")
+
+def split_lines(text, keepends=False):
+    """Return lines of the text split by the protocol line breaks, same as str.splitlines.
+
+    Other line breaks of str.splitlines e.g. form feed are part of the line.
+
+    """
+    parts = SPLIT_LINES.split(text)
+    if keepends:
+        lines = [parts[index] + parts[index + 1] for index in range(0, len(parts) - 1, 2)]
+    else:
+        lines = parts[:-1:2]
+    if parts[-1]:
+        lines.append(parts[-1])
+    return lines
+
+def uri_to_path(uri):
+    """Convert file URI used by the client to the file system path."""
+    parsed = urlparse(uri)
+    if parsed.scheme != "file":
+        return None
+    path = unquote(parsed.path)
+    # Windows path is send as /c:/path
+    if os.name != "posix" and len(path) > 2 and path[0] == "/" and path[2] == ":":
+        path = path[1:]
+    return os.path.normpath(path)
+
+def path_to_uri(path):
+    """Convert file system path to the file URI used by the client."""
+    path = os.path.abspath(path).replace(os.sep, "/")
+    if not path.startswith("/"):
+        # Windows path c:/path is send as /c:/path
+        path = "/" + path
+    return "file://" + quote(path)
+
 class CharsetException(Exception):
     """Custom class for throwing charset exception"""
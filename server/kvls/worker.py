@@ -0,0 +1,212 @@
+"""Module contains parser workers running under other Python interpreters.
+
+Worker is started lazily with script worker.py by the interpreter configured for the workspace
+folder, so documents are parsed and docstrings of the classes are loaded by Kivy installed in that
+interpreter, expressions are compiled by its Python and imports are resolved by its sys.path. Server and worker exchange one JSON object per line:
+    request: {"id": 1, "method": "parse", "params": {"text": "<Widget>:"}}
+    request: {"id": 2, "method": "docstring", "params": {"name": "Button"}}
+    request: {"id": 3, "method": "module", "params": {"name": "os.path", "paths": []}}
+    request: {"id": 4, "method": "expressions", "params": {"text": "<Widget>:"}}
+    response: {"id": 1, "result": ...} or {"id": 1, "error": "message"}
+
+"""
+from __future__ import absolute_import
+import json
+import os
+import subprocess
+import sys
+import threading
+from kvls.document import TextDocumentItem, LanguageId
+from kvls.kvlint import parse_exception
+from kvls.expression import analyze
+from kvls.lang import KIVY_IMPORTED, class_docstring
+try:
+    from shutil import which
+except ImportError:
+    from distutils.spawn import find_executable as which
+try:
+    from queue import Queue, Empty
+except ImportError:
+    from Queue import Queue, Empty
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             "worker.py")
+
+def resolve(executable):
+    """Return real path of the interpreter. None is returned when interpreter is not found."""
+    path = executable if os.path.dirname(executable) else which(executable)
+    if not path or not os.path.isfile(path):
+        return None
+    return os.path.realpath(path)
+
+def parse(params):
+    """Return serialized parser diagnostic of the KvLang text or None."""
+    diagnostic = parse_exception(TextDocumentItem("worker.kv", LanguageId.KVLANG,
+                                                  params["text"]), 0)
+    return diagnostic.serialize() if diagnostic is not None else None
+
+def version(_):
+    """Return versions of the Python and Kivy used by the worker."""
+    kivy_version = None
+    if KIVY_IMPORTED:
+        import kivy
+        kivy_version = kivy.__version__
+    return {"python": sys.version.split()[0], "kivy": kivy_version}
+
+def docstring(params):
+    """Return docstring of the Kivy class used by the worker."""
+    return class_docstring(params["name"])
+
+def expressions(params):
+    """Return syntax errors and undefined names of the KvLang text expressions."""
+    return analyze(TextDocumentItem("worker.kv", LanguageId.KVLANG, params["text"]))
+
+def module(params):
+    """Return path of the module found in sys.path of the worker or None."""
+    from kvls.workspace import find_module
+    return find_module(params["name"], params.get("paths") or ())
+
+PROCEDURES = {"parse": parse, "version": version, "docstring": docstring, "module": module,
+              "expressions": expressions}
+
+def serve(reader, writer):
+    """Answer requests from the reader until end of input."""
+    for line in iter(reader.readline, ""):
+        request = json.loads(line)
+        try:
+            response = {"id": request.get("id"),
+                        "result": PROCEDURES[request["method"]](request.get("params") or {})}
+        except Exception as exception:  # pylint: disable=W0703
+            response = {"id": request.get("id"), "error": "{}: {}".format(
+                type(exception).__name__, exception)}
+        writer.write(json.dumps(response, separators=(',', ':')) + "\n")
+        writer.flush()
+    return 0
+
+def read_lines(reader, lines):
+    """Put lines of the worker output to the queue. None is put at the end of output."""
+    try:
+        for line in iter(reader.readline, ""):
+            lines.put(line)
+    except (IOError, OSError, ValueError):
+        pass
+    finally:
+        reader.close()
+    lines.put(None)
+
+class Worker(object):
+    """Worker process of the single interpreter. Process is started on the first call.
+
+    Output of the process is read by the thread, so response is awaited only until timeout.
+    Worker which exited, timed out or wrote anything else than the response is killed and
+    started again on the next call.
+
+    """
+
+    TIMEOUT = 10
+
+    def __init__(self, executable, script=WORKER_SCRIPT, timeout=TIMEOUT):
+        """Initialize worker."""
+        self.executable = executable
+        self.script = script
+        self.timeout = timeout
+        self.process = None
+        self.lines = None
+        self.request_id = 0
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Start worker process and reader of its output when it is not running."""
+        if self.process is None or self.process.poll() is not None:
+            with open(os.devnull, "w") as devnull:
+                self.process = subprocess.Popen([self.executable, self.script],
+                                                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                                stderr=devnull, universal_newlines=True)
+            self.lines = Queue()
+            reader = threading.Thread(target=read_lines, args=(self.process.stdout, self.lines))
+            reader.daemon = True
+            reader.start()
+
+    def call(self, method, params):
+        """Call worker procedure and return its result. WorkerException is raised on failure."""
+        with self.lock:
+            self.request_id += 1
+            try:
+                self.start()
+                self.process.stdin.write(json.dumps({"id": self.request_id, "method": method,
+                                                     "params": params}) + "\n")
+                self.process.stdin.flush()
+                line = self.lines.get(timeout=self.timeout)
+                if line is None:
+                    raise IOError("process exited")
+                response = json.loads(line)
+                if not isinstance(response, dict) or response.get("id") != self.request_id:
+                    raise ValueError("unexpected output {!r}".format(line[:80]))
+            except Empty:
+                self.kill()
+                raise WorkerException("Worker {} timed out after {} seconds".format(
+                    self.executable, self.timeout))
+            except (IOError, OSError, ValueError) as exception:
+                self.kill()
+                raise WorkerException("Worker {} failed: {}".format(self.executable, exception))
+        if response.get("error") is not None:
+            raise WorkerException(response["error"])
+        return response.get("result")
+
+    def stop(self):
+        """Stop worker process. Worker is started again on the next call."""
+        process, self.process = self.process, None
+        if process is not None and process.poll() is None:
+            # Worker exit at the end of its input
+            process.stdin.close()
+            process.wait()
+
+    def kill(self):
+        """Kill worker process after failure. Worker is started again on the next call."""
+        process, self.process = self.process, None
+        if process is not None:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            try:
+                process.stdin.close()
+            except (IOError, OSError):
+                pass
+
+class WorkerPool(object):
+    """Workers keyed by the real path of the interpreter.
+
+    Interpreter which is running the server itself does not need a worker. For such interpreter
+    and for the unknown interpreters None is returned.
+
+    """
+
+    def __init__(self):
+        """Initialize pool."""
+        self.workers = dict()
+        self.current = os.path.realpath(sys.executable) if sys.executable else None
+        self.lock = threading.Lock()
+
+    def get(self, executable):
+        """Return worker of the interpreter or None when document can be parsed in server."""
+        if not executable:
+            return None
+        path = resolve(executable)
+        if path is None or path == self.current:
+            return None
+        with self.lock:
+            worker = self.workers.get(path)
+            if worker is None:
+                worker = self.workers[path] = Worker(path)
+            return worker
+
+    def close(self):
+        """Stop all workers."""
+        with self.lock:
+            workers = list(self.workers.values())
+            self.workers.clear()
+        for worker in workers:
+            worker.stop()
+
+class WorkerException(Exception):
+    """Custom class for throwing worker exception"""
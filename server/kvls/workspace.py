@@ -0,0 +1,300 @@
+"""Module contains dependency graph of the KvLang #:include and #:import directives.
+
+Directives are resolved from the scanned lines of the document. Included files and imported
+modules are only located on the file system. Modules are located by the worker of the interpreter
+configured for the document when there is one. Kivy and imported modules are never executed.
+
+"""
+from __future__ import absolute_import
+import io
+import os
+import sys
+from kvls.document import TextDocumentItem, LanguageId, line_index
+from kvls.kvlint import Severity, KvLint, parse_exception
+from kvls.protocol import Diagnostic, Position, Range
+from kvls.syntax import LineKind, document_lines
+from kvls.utils import CHARSET, uri_to_path
+from kvls.worker import WorkerException
+try:
+    from importlib.machinery import all_suffixes
+    MODULE_SUFFIXES = tuple(all_suffixes())
+except ImportError:
+    import imp
+    MODULE_SUFFIXES = tuple(suffix for suffix, _, _ in imp.get_suffixes())
+
+def include_reference(arguments):
+    """Return file referenced by #:include directive arguments. Same rules as in Kivy."""
+    reference = arguments.strip()
+    if reference[:6] == "force ":
+        reference = reference[6:].strip()
+    if reference and reference[0] == reference[-1] and reference[0] in ('"', "'"):
+        count = reference[:3].count(reference[0])
+        reference = reference[count:-count] if count != 2 else reference
+    return reference
+
+def find_module(name, search_paths=()):
+    """Return path of the module or package. None is returned when module is not found.
+
+    Module is searched in the search paths and then in sys.path of the current interpreter
+    without importing it.
+
+    """
+    if name in sys.builtin_module_names:
+        return name
+    if name in sys.modules:
+        # Module is already imported e.g. os.path
+        return getattr(sys.modules[name], "__file__", None) or name
+    parts = name.split(".")
+    for search_path in list(search_paths) + sys.path:
+        candidate = os.path.join(search_path or os.getcwd(), *parts)
+        if os.path.isdir(candidate):
+            return candidate
+        path = next((candidate + suffix for suffix in MODULE_SUFFIXES
+                     if os.path.isfile(candidate + suffix)), None)
+        if path is not None:
+            return path
+    return None
+
+class Workspace(object):
+    """Dependency graph of the KvLang files in the workspace.
+
+    Graph is keyed by the file system path of the document or by the uri when document is not
+    stored on the disk. Graph store:
+        includes: Key of the document and set of included files.
+        dependents: Key of the included file and set of documents which include it.
+        modules: Cache of the resolved imports. Interpreter, search paths and module name and
+            its path.
+        errors: Cache of the parser errors in the included files. Path and dictionary of the
+            interpreter and (stamp, diagnostic).
+
+    """
+
+    def __init__(self, root_path=None, worker=None):
+        """Initialize workspace. Worker return Worker of the document uri or None."""
+        self.root_path = root_path
+        self.folders = []
+        self.worker = worker
+        self.includes = dict()
+        self.dependents = dict()
+        self.modules = dict()
+        self.errors = dict()
+
+    def set_root(self, root_path, folders=None):
+        """Change root and folders of the workspace. Resolved imports are cleared."""
+        self.root_path = root_path
+        self.folders = list(folders or ())
+        self.modules.clear()
+
+    def forget_modules(self, paths):
+        """Forget resolved imports stored in the directory of any deleted file."""
+        directories = tuple(os.path.join(os.path.dirname(path), "") for path in paths)
+        if directories:
+            for key in [key for key, path in self.modules.items()
+                        if os.path.join(path, "").startswith(directories)]:
+                del self.modules[key]
+
+    def register(self, kvlint):
+        """Register workspace diagnostics in the KvLint."""
+        kvlint.register_document(self.include_exception, Severity.ERROR, "E002", KvLint.SOURCE)
+        kvlint.register_document(self.included_exception, Severity.ERROR, "E003",
+                                 KvLint.SOURCE)
+        kvlint.register_document(self.import_exception, Severity.WARNING, "W001",
+                                 KvLint.SOURCE)
+
+    @staticmethod
+    def key(uri):
+        """Return key of the document in the graph."""
+        return uri_to_path(uri) or uri
+
+    def directory(self, key):
+        """Return directory used to resolve relative includes of the document."""
+        if os.path.isabs(key):
+            return os.path.dirname(key)
+        return self.root_path or os.getcwd()
+
+    def directives(self, document, name):
+        """Return scanned lines of the specific directive in all KvLang regions of the document."""
+        return [kv_line for region in document.regions
+                for kv_line in region.cached("syntax", document_lines)
+                if kv_line.kind == LineKind.DIRECTIVE and kv_line.name == name]
+
+    def resolve_include(self, key, reference):
+        """Return path of the included file. Path is returned even when file does not exist."""
+        if os.path.isabs(reference):
+            return os.path.normpath(reference)
+        path = os.path.normpath(os.path.join(self.directory(key), reference))
+        if not os.path.isfile(path) and self.root_path:
+            from_root = os.path.normpath(os.path.join(self.root_path, reference))
+            if os.path.isfile(from_root):
+                return from_root
+        return path
+
+    def search_paths(self, key):
+        """Return paths searched for modules imported by the document before sys.path.
+
+        Directory of the document is searched first, then its workspace folder and root path.
+
+        """
+        paths = [self.directory(key)]
+        folders = [folder for folder in self.folders
+                   if key.startswith(os.path.join(folder, ""))]
+        if folders:
+            paths.append(max(folders, key=len))
+        if self.root_path:
+            paths.append(self.root_path)
+        return tuple(path for index, path in enumerate(paths) if path not in paths[:index])
+
+    def resolve_module(self, name, worker=None, search_paths=()):
+        """Return path of the module or package. None is returned when module is not found.
+
+        Module is searched in the search paths and sys.path by the worker of the interpreter
+        configured for the document or by the server. Found modules are cached per interpreter
+        and search paths. Missing modules are searched again, because they can be installed
+        later.
+
+        """
+        key = (worker.executable if worker is not None else None, search_paths, name)
+        try:
+            return self.modules[key]
+        except KeyError:
+            pass
+        path = None
+        if worker is not None:
+            try:
+                path = worker.call("module", {'name': name, 'paths': list(search_paths)})
+            except WorkerException:
+                worker = None
+        if worker is None:
+            path = find_module(name, search_paths)
+        if path is not None:
+            self.modules[key] = path
+        return path
+
+    def update(self, document):
+        """Update includes of the document. Return keys of all documents which depend on it."""
+        key = self.key(document.uri)
+        self.errors.pop(key, None)
+        includes = set(self.resolve_include(key, include_reference(kv_line.value))
+                       for kv_line in self.directives(document, "include")
+                       if include_reference(kv_line.value))
+        for included in self.includes.get(key, set()) - includes:
+            self.dependents.get(included, set()).discard(key)
+        for included in includes:
+            self.dependents.setdefault(included, set()).add(key)
+        self.includes[key] = includes
+        return self.transitive_dependents(key)
+
+    def remove(self, key):
+        """Remove includes of the deleted document. Return keys of documents which depend on it."""
+        self.errors.pop(key, None)
+        for included in self.includes.pop(key, set()):
+            self.dependents.get(included, set()).discard(key)
+        return self.transitive_dependents(key)
+
+    def transitive_dependents(self, key):
+        """Return keys of the documents which include file directly or by other files."""
+        result = set()
+        pending = [key]
+        while pending:
+            for dependent in self.dependents.get(pending.pop(), ()):
+                if dependent not in result and dependent != key:
+                    result.add(dependent)
+                    pending.append(dependent)
+        return result
+
+    def included_error(self, path, worker=None):
+        """Return parser diagnostic of the included file. Result is cached until file change.
+
+        File is parsed by the worker of the interpreter configured for the including document,
+        so it is parsed by the same Kivy as the document. Result is cached per interpreter.
+
+        """
+        try:
+            status = os.stat(path)
+        except OSError:
+            return None
+        stamp = (status.st_mtime, status.st_size)
+        executable = worker.executable if worker is not None else None
+        cached = self.errors.get(path, dict()).get(executable)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        try:
+            with io.open(path, mode="r", encoding=CHARSET) as file:
+                text = file.read()
+        except (IOError, OSError, ValueError):
+            return None
+        diagnostic = self.parse_included(path, text, worker)
+        self.errors.setdefault(path, dict())[executable] = (stamp, diagnostic)
+        return diagnostic
+
+    @staticmethod
+    def parse_included(path, text, worker):
+        """Return parser diagnostic of the included file parsed by the worker or by the server."""
+        if worker is not None:
+            try:
+                result = worker.call("parse", {'text': text})
+            except WorkerException:
+                # Included file is parsed by the server
+                pass
+            else:
+                if result is None:
+                    return None
+                start = result["range"]["start"]
+                end = result["range"]["end"]
+                return Diagnostic(Range(Position(start["line"], start["character"]),
+                                        Position(end["line"], end["character"])),
+                                  result["message"])
+        return parse_exception(TextDocumentItem(path, LanguageId.KVLANG, text), 0)
+
+    @staticmethod
+    def arguments_range(document, kv_line):
+        """Return range of the directive arguments."""
+        return document.cached("lines", line_index).range(
+            kv_line.line, kv_line.value_start, kv_line.value_start + len(kv_line.value.rstrip()))
+
+    def include_exception(self, document, _):
+        """Check if files included by the document exist."""
+        key = self.key(document.uri)
+        diagnostics = []
+        for kv_line in self.directives(document, "include"):
+            reference = include_reference(kv_line.value)
+            if reference and not os.path.isfile(self.resolve_include(key, reference)):
+                diagnostics.append(Diagnostic(self.arguments_range(document, kv_line),
+                                              "Invalid or unknown file: {}".format(reference)))
+        return diagnostics
+
+    def included_exception(self, document, _):
+        """Check if files included by the document can be parsed."""
+        key = self.key(document.uri)
+        worker = self.worker(document.uri) if self.worker is not None else None
+        diagnostics = []
+        for kv_line in self.directives(document, "include"):
+            reference = include_reference(kv_line.value)
+            if not reference:
+                continue
+            error = self.included_error(self.resolve_include(key, reference), worker)
+            if error is not None:
+                diagnostics.append(Diagnostic(self.arguments_range(document, kv_line),
+                                              "Included file {} contains error at line {}: {}".
+                                              format(reference, error.range.start.line + 1,
+                                                     error.message)))
+        return diagnostics
+
+    def import_exception(self, document, _):
+        """Check if modules imported by the document can be found."""
+        worker = self.worker(document.uri) if self.worker is not None else None
+        search_paths = self.search_paths(self.key(document.uri))
+        diagnostics = []
+        for kv_line in self.directives(document, "import"):
+            arguments = kv_line.value.split()
+            if len(arguments) != 2:
+                diagnostics.append(Diagnostic(self.arguments_range(document, kv_line),
+                                              "Invalid import syntax"))
+                continue
+            package = arguments[1]
+            if self.resolve_module(package, worker, search_paths) is None and \
+               (package.find(".") == -1 or
+                self.resolve_module(package.rsplit(".", 1)[0], worker, search_paths) is None):
+                diagnostics.append(Diagnostic(self.arguments_range(document, kv_line),
+                                              "Unable to resolve import: {}".format(package)))
+        return diagnostics
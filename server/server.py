@@ -1,10 +1,36 @@
-"""Script which start KvLang Language Server."""
+"""Script which start KvLang Language Server.
+
+With DAEMON_MODE argument script forward its stdio to the shared daemon, which is started when
+it is not running. Server run over stdio when daemon is not supported, its private socket
+directory cannot be used or daemon cannot be started.
+
+"""
 from __future__ import absolute_import
+import os
 import sys
-from kvls.kvlangserver import KvLangServer
+from kvls import daemon
+
+def main(argv):
+    """Run language server, daemon or proxy to the daemon according to the arguments."""
+    if daemon.supported():
+        path = daemon.socket_path()
+        if daemon.DAEMON_PROCESS in argv:
+            if path is None:
+                return daemon.EXIT_ERROR
+            return daemon.KvLangDaemon(path, argv).serve()
+        if daemon.DAEMON_MODE in argv and path is not None:
+            client = daemon.connect(path) or \
+                     daemon.spawn(path, os.path.abspath(__file__), argv[1:])
+            if client is not None:
+                return daemon.proxy(client, sys.stdin, sys.stdout)
+    from kvls.kvlangserver import KvLangServer
+    server = KvLangServer(sys.stdin, sys.stdout)
+    server.logger.enable_debug_mode(argv)
+    server.profiler.enable_profile_mode(argv)
+    try:
+        return server.run()
+    finally:
+        server.workers.close()
 
 if __name__ == "__main__":
-    SERVER = KvLangServer(sys.stdin, sys.stdout)
-    SERVER.logger.enable_debug_mode(sys.argv)
-    SERVER_EXIT_CODE = SERVER.run()
-    sys.exit(SERVER_EXIT_CODE)
+    sys.exit(main(sys.argv))
@@ -0,0 +1,47 @@
+"""Unit tests for Config module."""
+from __future__ import absolute_import
+import unittest
+import os
+import shutil
+import tempfile
+from kvls.config import LintConfig, load_kvlintrc
+
+class LintConfigTest(unittest.TestCase):
+    """LintConfig UnitTest."""
+
+    def test_update(self):
+        """Test check update of configuration with settings dictionary."""
+        config = LintConfig()
+        self.assertTrue(config.enabled("I001"))
+        self.assertEqual(config.max_line_length, LintConfig.MAX_LINE_LENGTH)
+        self.assertIs(config.update(None), config)
+
+        config = config.update({"disable": ["I001"], "maxLineLength": 80})
+        self.assertFalse(config.enabled("I001"))
+        self.assertTrue(config.enabled("I002"))
+        self.assertEqual(config.max_line_length, 80)
+
+        config = config.update({"disable": "I002", "maxLineLength": "long"})
+        self.assertFalse(config.enabled("I001"))
+        self.assertEqual(config.max_line_length, 80)
+
+        # Values not set by client and invalid length keep previous configuration
+        config = config.update({"disable": None, "maxLineLength": None})
+        self.assertFalse(config.enabled("I001"))
+        self.assertEqual(config.update({"maxLineLength": 0}).max_line_length, 80)
+        self.assertEqual(config.update({"maxLineLength": -5}).max_line_length, 80)
+
+    def test_load_kvlintrc(self):
+        """Test check loading of .kvlintrc file from directory."""
+        directory = tempfile.mkdtemp()
+        try:
+            self.assertEqual(load_kvlintrc(directory), {})
+            self.assertEqual(load_kvlintrc(None), {})
+            with open(os.path.join(directory, ".kvlintrc"), mode="w") as file:
+                file.write('{"disable": ["E001"]}')
+            self.assertEqual(load_kvlintrc(directory), {"disable": ["E001"]})
+            with open(os.path.join(directory, ".kvlintrc"), mode="w") as file:
+                file.write('{"disable": ')
+            self.assertEqual(load_kvlintrc(directory), {})
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,133 @@
+"""Unit tests for Daemon module."""
+from __future__ import absolute_import
+import unittest
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+# Disable UnitTest.
+os.environ["KIVY_UNITTEST"] = "0"
+from kvls import daemon # pylint: disable=C0413
+
+@unittest.skipUnless(daemon.supported(), "Unix domain sockets are not supported")
+class KvLangDaemonTest(unittest.TestCase):
+    """KvLangDaemon UnitTest."""
+
+    def setUp(self):
+        """Start daemon on the temporary socket."""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "kvls.sock")
+        self.daemon = daemon.KvLangDaemon(self.path, idle_timeout=0.2)
+        self.assertTrue(self.daemon.bind())
+        self.daemon.bind = lambda: True
+        self.exit_code = None
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.start()
+
+    def tearDown(self):
+        """Cleanup of the tests."""
+        self.thread.join(5)
+        shutil.rmtree(self.directory)
+
+    def serve(self):
+        """Run daemon and store its exit code."""
+        self.exit_code = self.daemon.serve()
+
+    def session(self):
+        """Send messages of the initialized flow and return daemon output."""
+        client = daemon.connect(self.path)
+        self.assertIsNotNone(client)
+        with open('./server/tests/initialized.txt', mode='rb') as file:
+            client.sendall(file.read())
+        client.shutdown(socket.SHUT_WR)
+        output = b""
+        data = client.recv(daemon.BUFFER_SIZE)
+        while data:
+            output += data
+            data = client.recv(daemon.BUFFER_SIZE)
+        client.close()
+        return output.decode("utf-8")
+
+    def test_sessions(self):
+        """Test check that daemon serve several clients and exit when idle."""
+        for _ in range(2):
+            output = self.session()
+            self.assertIn('"id":0,"result":{"capabilities"', output)
+            self.assertIn('"id":1,"result":{}', output)
+        self.thread.join(5)
+        self.assertEqual(self.exit_code, daemon.EXIT_SUCCESS)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_shared_caches(self):
+        """Test check that connections share parse caches, symbol index and workers."""
+        first = self.daemon.create_server(None, None)
+        second = self.daemon.create_server(None, None)
+        self.assertIs(first.workspace.errors, second.workspace.errors)
+        self.assertIs(first.symbol_index, second.symbol_index)
+        self.assertIs(first.workers, second.workers)
+        self.assertIsNot(first.workspace, second.workspace)
+
+    def test_broken_session(self):
+        """Test check that error of the session is logged and the daemon keep running."""
+        messages = []
+        logger = daemon.Logger("KvLangDebug")
+        logger.log = lambda log_type, msg: messages.append(msg)
+        class BrokenServer(object):
+            """Server which fail during run."""
+
+            def __init__(self):
+                """Initialize server with recording logger."""
+                self.logger = logger
+
+            def run(self):
+                """Fail immediately."""
+                raise RuntimeError("broken session")
+
+        create_server = self.daemon.create_server
+        self.daemon.create_server = lambda reader, writer: BrokenServer()
+        client = daemon.connect(self.path)
+        self.assertEqual(client.recv(daemon.BUFFER_SIZE), b"")
+        client.close()
+        self.assertIn("RuntimeError: broken session", messages[0])
+        self.daemon.create_server = create_server
+        self.assertIn('"id":0,"result":{"capabilities"', self.session())
+
+    def test_single_daemon(self):
+        """Test check that second daemon does not bind used socket."""
+        other = daemon.KvLangDaemon(self.path)
+        self.assertFalse(other.bind())
+
+    def test_socket_path(self):
+        """Test check that every interpreter has its own socket in the private directory."""
+        path = daemon.socket_path("/usr/bin/python2")
+        self.assertNotEqual(path, daemon.socket_path("/usr/bin/python3"))
+        self.assertTrue(daemon.private(os.path.dirname(path)))
+        os.chmod(self.directory, 0o755)
+        self.assertFalse(daemon.private(self.directory))
+
+    def test_foreign_file(self):
+        """Test check that file which is not socket is neither used nor removed."""
+        path = os.path.join(self.directory, "other.sock")
+        with open(path, mode="w") as file:
+            file.write("")
+        self.assertIsNone(daemon.connect(path))
+        self.assertFalse(daemon.KvLangDaemon(path).bind())
+        self.assertTrue(os.path.isfile(path))
+
+    def test_pending_client(self):
+        """Test check that client connected before idle check is served."""
+        other = daemon.KvLangDaemon(os.path.join(self.directory, "other.sock"))
+        self.assertTrue(other.bind())
+        client = daemon.connect(other.path)
+        self.assertIsNotNone(client)
+        self.assertFalse(other.idle())
+        self.assertFalse(os.path.exists(other.path))
+        client.close()
+        for _ in range(100):
+            if other.idle():
+                break
+            time.sleep(0.05)
+        self.assertEqual(other.connections, 0)
+        other.listener.close()
@@ -0,0 +1,128 @@
+"""Unit tests for Document module."""
+from __future__ import absolute_import
+import unittest
+from kvls.document import TextDocumentManager, TextDocumentItem, LineIndex, line_index
+
+class TextDocumentManagerTest(unittest.TestCase):
+    """TextDocumentManager UnitTest."""
+
+    def setUp(self):
+        """Create parameters required to run unit tests."""
+        self.manager = TextDocumentManager(memory_budget=20)
+        self.first = TextDocumentItem("first.kv", "kv", "<First>:" + " " * 4)
+        self.second = TextDocumentItem("second.kv", "kv", "<Second>:" + " " * 3)
+
+    def test_remove(self):
+        """Test check removing of known and unknown documents."""
+        self.manager.add(self.first)
+        self.manager.remove("first.kv")
+        self.manager.remove("unknown.kv")
+        self.assertEqual(len(self.manager.documents), 0)
+        with self.assertRaises(KeyError):
+            self.manager.get("first.kv")
+
+    def test_eviction(self):
+        """Test check compression of least recently used documents."""
+        self.manager.add(self.first)
+        self.assertEqual(self.manager.resident_size, 12)
+        self.manager.add(self.second)
+        self.assertFalse(self.first.resident)
+        self.assertTrue(self.second.resident)
+        self.assertEqual(self.manager.resident_size, 12)
+
+        document = self.manager.get("first.kv")
+        self.assertIs(document, self.first)
+        self.assertTrue(self.first.resident)
+        self.assertFalse(self.second.resident)
+        self.assertEqual(document.text, "<First>:" + " " * 4)
+        self.assertEqual(list(self.manager.documents), ["second.kv", "first.kv"])
+
+    def test_resident_size(self):
+        """Test check total of the text changes and cache drop before compression."""
+        self.manager.add(self.first)
+        self.first.text = "<First>:"
+        self.assertEqual(self.manager.resident_size, 8)
+        self.first.cached("lines", line_index)
+        self.assertEqual(self.manager.resident_size, 16)
+        self.manager.add(self.second)
+        # Cached values of the first document are dropped, its text stay resident
+        self.assertTrue(self.first.resident)
+        self.assertEqual(self.first.size, 8)
+        self.assertEqual(self.manager.resident_size, 20)
+        self.manager.remove("second.kv")
+        self.assertEqual(self.manager.resident_size, 8)
+        self.second.text = "<Second>:"
+        self.assertEqual(self.manager.resident_size, 8)
+
+    def test_text_eviction(self):
+        """Test check that document restored outside of the manager evict other documents."""
+        self.manager.add(self.first)
+        self.manager.add(self.second)
+        self.assertFalse(self.first.resident)
+        self.assertEqual(self.first.text, "<First>:" + " " * 4)
+        self.assertFalse(self.second.resident)
+        self.assertEqual(self.manager.resident_size, 12)
+
+    def test_kept_values(self):
+        """Test check that kept values survive text change and are dropped on compression."""
+        self.manager.add(self.first)
+        self.first.keep("tokens", [1, 2, 3], 3)
+        self.first.text = "<First>:"
+        self.assertEqual(self.first.kept("tokens"), [1, 2, 3])
+        self.assertEqual(self.manager.resident_size, 11)
+        self.manager.add(self.second)
+        self.assertIsNone(self.first.kept("tokens"))
+        self.assertEqual(self.manager.resident_size, 20)
+
+    def test_python_regions(self):
+        """Test check line and prefix of the KvLang tag after form feed."""
+        document = TextDocumentItem("file.py", "python", u"x = 1\x0cy = 2  #<KvLang>\n"
+                                                         "<A>:\n#</KvLang>\n")
+        region = document.regions[0]
+        self.assertEqual((region.beginning_index, region.prefix), (0, u"x = 1\x0cy = 2  "))
+
+    def test_text_access(self):
+        """Test check that compressed document restore its text on access."""
+        self.first.compress()
+        self.assertFalse(self.first.resident)
+        self.assertEqual(self.first.size, 0)
+        self.assertEqual(self.first.text, "<First>:" + " " * 4)
+        self.assertTrue(self.first.resident)
+
+        self.second.compress()
+        self.second.text = "<Third>:"
+        self.assertTrue(self.second.resident)
+        self.assertEqual(self.second.text, "<Third>:")
+
+class LineIndexTest(unittest.TestCase):
+    """LineIndex UnitTest."""
+
+    def test_lines(self):
+        """Test check lines and offsets of the text with mixed line breaks."""
+        lines = LineIndex("a\r\nbc\rd\n", 2)
+        self.assertEqual([lines.line(offset) for offset in range(8)], [2, 2, 2, 3, 3, 3, 4, 4])
+        self.assertEqual([lines.line_text(line) for line in range(2, 6)], ["a", "bc", "d", ""])
+        self.assertEqual(lines.line_offset(4), 6)
+        # Only line breaks of the protocol split lines
+        lines = LineIndex(u"a\x0cb\u2028c\x85d\r\ne")
+        self.assertEqual([lines.line_text(line) for line in range(3)],
+                         [u"a\x0cb\u2028c\x85d", u"e", u""])
+
+    def test_utf16_columns(self):
+        """Test check that only columns after non-BMP characters are shifted."""
+        lines = LineIndex(u"ab\n\U0001F600x \U0001F600y  \nz")
+        self.assertEqual(list(lines.wide), [1])
+        self.assertEqual([lines.character(1, column) for column in range(6)], [0, 2, 3, 4, 6, 7])
+        self.assertEqual(lines.character(0, 2), 2)
+        self.assertEqual([lines.column(1, character) for character in range(8)],
+                         [0, 0, 1, 2, 3, 3, 4, 5])
+        self.assertEqual(lines.span(7, 9).serialize(),
+                         {'start': {'line': 1, 'character': 6}, 'end': {'line': 1, 'character': 8}})
+        self.assertEqual(lines.content(1).end.character, 7)
+        # First line of the embedded text is shifted by the prefix
+        lines = LineIndex(u"<A>:\n<B>:\n", 3, u'x = "\U0001F600"; load_string("')
+        self.assertEqual(lines.content(3).serialize(),
+                         {'start': {'line': 3, 'character': 23},
+                          'end': {'line': 3, 'character': 27}})
+        self.assertEqual(lines.content(4).start.character, 0)
+        self.assertEqual(lines.column(3, 24), 1)
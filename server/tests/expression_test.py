@@ -0,0 +1,62 @@
+"""Unit tests for Expression module."""
+from __future__ import absolute_import
+import unittest
+from kvls.expression import ExpressionCache, compile_expression, expression_exception, \
+    undefined_name
+from kvls.document import TextDocumentItem
+
+KV_TEXT = """#:import utils kivy.utils
+#:set padding 10
+<Root@BoxLayout>:
+    Label:
+        id: title
+        text: 'Hello ' + name
+        size_hint: (1,
+    Button:
+        padding: padding, dp(4)
+        color: utils.get_color_from_hex('#ffffff')
+        on_press:
+            # Multiline handler
+            value = args[0]
+            title.text = str(value) + missing
+        width: [x * 2 for x in range(3)][0]
+        height: self.width +
+<Other>:
+    text: title.text
+"""
+
+class ExpressionTest(unittest.TestCase):
+    """Expression UnitTest."""
+
+    def test_compile_expression(self):
+        """Test check compilation result of the expressions."""
+        compiled = compile_expression("root.width + value", "eval")
+        self.assertIsNone(compiled.error)
+        self.assertEqual(compiled.names, (("root", 1, 0), ("value", 1, 13)))
+        compiled = compile_expression("lambda x: x + y", "eval")
+        self.assertEqual(compiled.names, (("y", 1, 14),))
+        compiled = compile_expression("a = 1\nb = (", "exec")
+        self.assertIsNotNone(compiled.error)
+        self.assertEqual(compiled.line, 2)
+
+    def test_cache(self):
+        """Test check bounded cache of the compiled expressions."""
+        cache = ExpressionCache(max_size=2)
+        first = cache.compile("a + 1", "eval")
+        self.assertIs(cache.compile("a + 1", "eval"), first)
+        cache.compile("b + 1", "eval")
+        cache.compile("c + 1", "eval")
+        self.assertEqual(list(cache.entries), [("eval", "b + 1"), ("eval", "c + 1")])
+        self.assertIsNot(cache.compile("a + 1", "eval"), first)
+
+    def test_diagnostics(self):
+        """Test check all syntax errors and undefined names of the document."""
+        document = TextDocumentItem("file.kv", "kv", KV_TEXT)
+        errors = [diagnostic.range.start.line for diagnostic in
+                  expression_exception(document, 0)]
+        self.assertEqual(errors, [6, 15])
+        names = [(diagnostic.range.start.line, diagnostic.message) for diagnostic in
+                 undefined_name(document, 0)]
+        self.assertEqual(names, [(5, "Undefined name 'name'"),
+                                 (13, "Undefined name 'missing'"),
+                                 (17, "Undefined name 'title'")])
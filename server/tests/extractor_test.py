@@ -0,0 +1,78 @@
+"""Unit tests for Extractor module."""
+from __future__ import absolute_import
+import unittest
+from kvls.extractor import KvExtractor, string_value
+
+SOURCE = '''from kivy.lang import Builder
+
+KV = """
+<Root>:
+    text: 'a'
+"""
+OTHER = "<Other>:"
+
+def load():
+    Builder.load_string(KV)
+    return Builder.load_string('<Inline>:')
+'''
+
+class KvExtractorTest(unittest.TestCase):
+    """KvExtractor UnitTest."""
+
+    def setUp(self):
+        """Create parameters required to run unit tests."""
+        self.extractor = KvExtractor()
+
+    def test_string_value(self):
+        """Test check evaluation of string tokens."""
+        self.assertEqual(string_value("'a'"), "a")
+        self.assertEqual(string_value('r"\\n"'), "\\n")
+        self.assertEqual(string_value("b'a'"), None)
+        self.assertEqual(string_value("f'{a}'"), None)
+        # Value which does not map to the source
+        self.assertEqual(string_value("'a\\nb'"), None)
+        self.assertEqual(string_value("'a\\\nb'"), None)
+        self.assertEqual(string_value('"""a\r\nb"""'), "a\nb")
+
+    def test_extract(self):
+        """Test check literals and referenced assignments."""
+        regions = self.extractor.extract(SOURCE)
+        self.assertEqual(regions, [(2, 8, "\n<Root>:\n    text: 'a'\n"), (10, 32, "<Inline>:")])
+        self.assertEqual(self.extractor.statements, [0, 2, 6, 8])
+
+    def test_form_feed(self):
+        """Test check that form feed does not split the line passed to tokenizer."""
+        source = SOURCE.replace("\ndef load():", "\n\x0c\ndef load():").replace(
+            "OTHER", "\x0cOTHER")
+        self.assertEqual(self.extractor.extract(source),
+                         [(2, 8, "\n<Root>:\n    text: 'a'\n"), (11, 32, "<Inline>:")])
+
+    def test_incremental(self):
+        """Test check that edited source give same result as fresh extraction."""
+        self.extractor.extract(SOURCE)
+        edits = (SOURCE.replace("OTHER = ", "\nOTHER = "),
+                 SOURCE.replace("<Root>:", "<Root>:\n<Added>:"),
+                 SOURCE.replace("load_string(KV)", "load_string(OTHER)"),
+                 SOURCE.replace('KV = """', '    KV = """'),
+                 SOURCE.replace('"""\nOTHER', 'OTHER'),
+                 SOURCE)
+        for source in edits:
+            fresh = KvExtractor()
+            self.assertEqual(self.extractor.extract(source), fresh.extract(source))
+            self.assertEqual(self.extractor.entries, fresh.entries)
+            self.assertEqual(self.extractor.statements, fresh.statements)
+
+    def test_expression(self):
+        """Test check that strings which are only part of the argument are skipped."""
+        source = ('Builder.load_string("<A>:" "<B>:")\n'
+                  'Builder.load_string("<A>:\\n    text: x")\n'
+                  'Builder.load_string(KV % 1)\n'
+                  'KV = "<C>:" + "<D>:"\n'
+                  'Builder.load_string(r"<E>:")  # comment\n')
+        self.assertEqual(self.extractor.extract(source), [(4, 22, "<E>:")])
+
+    def test_incomplete(self):
+        """Test check that tokenize error keep entries found before it."""
+        source = SOURCE + 'Builder.load_string("""\n<Open>:\n'
+        self.assertEqual(self.extractor.extract(source),
+                         [(2, 8, "\n<Root>:\n    text: 'a'\n"), (10, 32, "<Inline>:")])
@@ -6,7 +6,8 @@ import os
 os.environ["KIVY_UNITTEST"] = "0"
 import kvls.kvlint as KV # pylint: disable=C0413
 from kvls.utils import EOL # pylint: disable=C0413
-from kvls.document import TextDocumentItem # pylint: disable=C0413
+from kvls.document import TextDocumentItem, LineIndex # pylint: disable=C0413
+from kvls.config import LintConfig # pylint: disable=C0413
 
 
 class KvLintTest(unittest.TestCase):
@@ -32,30 +33,30 @@ class KvLintTest(unittest.TestCase):
 	    # Negative diagnostic
         self.kv_document.text = "<AnchorLayout"
         diagnostic = KV.parse_exception(self.kv_document, self.kv_document.beginning_index)
-        self.assertEqual(diagnostic["range"]["start"]['line'], 0)
-        self.assertEqual(diagnostic["range"]["end"]['line'], 0)
-        self.assertEqual(diagnostic["range"]["start"]['character'], 0)
-        self.assertEqual(diagnostic["range"]["end"]['character'], 0)
-        self.assertEqual(diagnostic["message"], "Invalid rule (must be inside <>)")
+        self.assertEqual(diagnostic.range.start.line, 0)
+        self.assertEqual(diagnostic.range.end.line, 0)
+        self.assertEqual(diagnostic.range.start.character, 0)
+        self.assertEqual(diagnostic.range.end.character, 13)
+        self.assertEqual(diagnostic.message, "Invalid rule (must be inside <>)")
         # Negative diagnostic EOL
         self.kv_document.text = "AnchorLayout: {}    height: '28sp".format(EOL)
         diagnostic = KV.parse_exception(self.kv_document, self.kv_document.beginning_index)
-        self.assertEqual(diagnostic["range"]["start"]['line'], 1)
-        self.assertEqual(diagnostic["range"]["end"]['line'], 1)
-        self.assertEqual(diagnostic["range"]["start"]['character'], 0)
-        self.assertEqual(diagnostic["range"]["end"]['character'], 0)
-        self.assertEqual(diagnostic["message"], "EOL while scanning string literal")
+        self.assertEqual(diagnostic.range.start.line, 1)
+        self.assertEqual(diagnostic.range.end.line, 1)
+        self.assertEqual(diagnostic.range.start.character, 4)
+        self.assertEqual(diagnostic.range.end.character, 17)
+        self.assertEqual(diagnostic.message, "EOL while scanning string literal")
 
     def test_parse_base_exception(self):
         """Test check BaseException from Kivy parser."""
         self.kv_document.text = 'Label<>:{}  size: 123{}    ' \
                                 'width: 12 // 12{}    size: 1{}{}'''.format(EOL, EOL, EOL, EOL, EOL)
         diagnostic = KV.parse_exception(self.kv_document, self.kv_document.beginning_index)
-        self.assertEqual(diagnostic["range"]["start"]['line'], 0)
-        self.assertEqual(diagnostic["range"]["end"]['line'], 0)
-        self.assertEqual(diagnostic["range"]["start"]['character'], 0)
-        self.assertEqual(diagnostic["range"]["end"]['character'], 0)
-        self.assertEqual(diagnostic["message"],
+        self.assertEqual(diagnostic.range.start.line, 0)
+        self.assertEqual(diagnostic.range.end.line, 0)
+        self.assertEqual(diagnostic.range.start.character, 0)
+        self.assertEqual(diagnostic.range.end.character, 0)
+        self.assertEqual(diagnostic.message,
                          "Kivy parser exception: 'NoneType' object is not subscriptable")
 
     def test_parse(self):
@@ -70,39 +71,109 @@ class KvLintTest(unittest.TestCase):
         self.assertIsInstance(diagnostics, list)
         self.assertEqual(len(diagnostics), 2)
 
+    def test_configure(self):
+        """Test check that disabled diagnostics are not executed."""
+        self.kv_document.text = "<A>:  " + EOL + "    text: '" + "a" * 20 + "'" + EOL + EOL
+        codes = [diagnostic.code for diagnostic in self.kvlint.parse(self.kv_document)]
+        self.assertEqual(sorted(codes), ["I002", "I004"])
+
+        self.kvlint.configure(LintConfig(disable=["I002", "I004"], max_line_length=20))
+        diagnostics = self.kvlint.parse(self.kv_document)
+        self.assertEqual([diagnostic.code for diagnostic in diagnostics], ["I001"])
+        self.assertEqual(diagnostics[0].range.start.line, 1)
+        self.assertEqual(diagnostics[0].message, "Line to long ({},{})".format(32, 20))
+
     def test_common_validation(self):
         """Test check common validation."""
-        diagnostic = KV.trailing_whitespace("NewLine    ", 99)
-        self.assertEqual(diagnostic["range"]["start"]['line'], 99)
-        self.assertEqual(diagnostic["range"]["end"]['line'], 99)
-        self.assertEqual(diagnostic["range"]["start"]['character'], 0)
-        self.assertEqual(diagnostic["range"]["end"]['character'], 0)
-        self.assertEqual(diagnostic["message"], "Trailing whitespace")
-
-        diagnostic = KV.line_to_long("".join(["a" for x in range(0, 120)]), 0)
-        self.assertEqual(diagnostic["range"]["start"]['line'], 0)
-        self.assertEqual(diagnostic["range"]["end"]['line'], 0)
-        self.assertEqual(diagnostic["range"]["start"]['character'], 0)
-        self.assertEqual(diagnostic["range"]["end"]['character'], 0)
-        self.assertEqual(diagnostic["message"], "Line to long ({},{})".format(120, 110))
+        diagnostics = KV.trailing_whitespace("NewLine    ", LineIndex("NewLine    ", 99))
+        self.assertEqual(len(diagnostics), 1)
+        diagnostic = diagnostics[0]
+        self.assertEqual(diagnostic.range.start.line, 99)
+        self.assertEqual(diagnostic.range.end.line, 99)
+        self.assertEqual(diagnostic.range.start.character, 7)
+        self.assertEqual(diagnostic.range.end.character, 11)
+        self.assertEqual(diagnostic.message, "Trailing whitespace")
+
+        line = "".join(["a" for x in range(0, 120)])
+        diagnostics = KV.line_to_long(line, LineIndex(line))
+        self.assertEqual(len(diagnostics), 1)
+        diagnostic = diagnostics[0]
+        self.assertEqual(diagnostic.range.start.line, 0)
+        self.assertEqual(diagnostic.range.end.line, 0)
+        self.assertEqual(diagnostic.range.start.character, 110)
+        self.assertEqual(diagnostic.range.end.character, 120)
+        self.assertEqual(diagnostic.message, "Line to long ({},{})".format(120, 110))
+        # Cache of the patterns is bounded
+        for max_line_length in range(1, 3 * KV.LINE_TO_LONG_PATTERNS_SIZE):
+            KV.line_to_long(line, LineIndex(line), LintConfig(max_line_length=max_line_length))
+        self.assertLessEqual(len(KV.LINE_TO_LONG_PATTERNS), KV.LINE_TO_LONG_PATTERNS_SIZE)
+
+    def test_buffer_validation(self):
+        """Test check whole buffer validation of the multiline text."""
+        text = "<A>: {}  a: 1\t{}{}{}  b: 2 \r\n  c: 3\r\n".format(EOL, EOL, "b" * 110, EOL)
+        diagnostics = KV.trailing_whitespace(text, LineIndex(text, 2))
+        self.assertEqual([diagnostic.range.start.line for diagnostic in diagnostics], [2, 3, 5])
+        diagnostics = KV.line_to_long(text, LineIndex(text, 2))
+        self.assertEqual([diagnostic.range.start.line for diagnostic in diagnostics], [4])
+        self.assertEqual(diagnostics[0].message, "Line to long ({},{})".format(110, 110))
+
+    def test_line_breaks(self):
+        """Test check that only line breaks of the protocol split lines."""
+        text = u"<A>: \x0c    a: 1 \u2028{} \rc\n".format("b" * 111)
+        lines = LineIndex(text)
+        self.assertEqual([diagnostic.range.start.line
+                          for diagnostic in KV.trailing_whitespace(text, lines)], [0])
+        diagnostics = KV.line_to_long(text, lines)
+        self.assertEqual([(diagnostic.range.start.line, diagnostic.range.start.character)
+                          for diagnostic in diagnostics], [(0, 110)])
+        self.kv_document.text = u"<A>:\u2029"
+        self.assertIsNotNone(KV.newline_missing(self.kv_document, 0))
+        # Form feed does not start new line of the scanned lines
+        self.kv_document.text = u"#\x0c page\n<A>:\n    text: name\n"
+        self.assertEqual([(diagnostic.code, diagnostic.range.start.line)
+                          for diagnostic in self.kvlint.parse(self.kv_document)
+                          if diagnostic.code == "W002"], [("W002", 2)])
+
+    def test_kivy_line(self):
+        """Test check that lines of Kivy parser split by form feed are mapped to the text."""
+        text = u"#\x0c\n<A>:\n    a: 1\n  b: 1\n"
+        self.assertEqual([KV.kivy_line(text, line) for line in range(5)], [0, 0, 1, 2, 3])
+        self.assertEqual(KV.kivy_line("<A>:\n", 1), 1)
+        self.kv_document.text = text
+        diagnostic = KV.parse_exception(self.kv_document, 0)
+        self.assertEqual(diagnostic.range.start.line, 3)
+
+    def test_utf16_columns(self):
+        """Test check that columns are counted in UTF-16 code units."""
+        text = u"<A>:{0}    text: '\U0001F600 \u00e9'  {0}".format(EOL)
+        diagnostics = KV.trailing_whitespace(text, LineIndex(text))
+        self.assertEqual(diagnostics[0].range.start.line, 1)
+        self.assertEqual(diagnostics[0].range.start.character, 16)
+        self.assertEqual(diagnostics[0].range.end.character, 18)
+
+        self.kv_document.text = u"<A>:{0}    text: name + '\U0001F600' + other{0}".format(EOL)
+        diagnostics = [(diagnostic.code, diagnostic.range.start.character,
+                        diagnostic.range.end.character)
+                       for diagnostic in self.kvlint.parse(self.kv_document)]
+        self.assertEqual(diagnostics, [("W002", 10, 14), ("W002", 24, 29)])
 
     def test_new_line_validation(self):
         """Test check newlines validation."""
         self.kv_document.text = "" + EOL
         diagnostic = KV.trailing_newline(self.kv_document, self.kv_document.beginning_index)
-        self.assertEqual(diagnostic["range"]["start"]['line'], 0)
-        self.assertEqual(diagnostic["range"]["end"]['line'], 0)
-        self.assertEqual(diagnostic["range"]["start"]['character'], 0)
-        self.assertEqual(diagnostic["range"]["end"]['character'], 0)
-        self.assertEqual(diagnostic["message"], "Trailing newlines")
+        self.assertEqual(diagnostic.range.start.line, 0)
+        self.assertEqual(diagnostic.range.end.line, 0)
+        self.assertEqual(diagnostic.range.start.character, 0)
+        self.assertEqual(diagnostic.range.end.character, 0)
+        self.assertEqual(diagnostic.message, "Trailing newlines")
 
         self.kv_document.text = "NewLine"
         diagnostic = KV.newline_missing(self.kv_document, self.kv_document.beginning_index)
-        self.assertEqual(diagnostic["range"]["start"]['line'], 0)
-        self.assertEqual(diagnostic["range"]["end"]['line'], 0)
-        self.assertEqual(diagnostic["range"]["start"]['character'], 0)
-        self.assertEqual(diagnostic["range"]["end"]['character'], 0)
-        self.assertEqual(diagnostic["message"], "Final newline missing")
+        self.assertEqual(diagnostic.range.start.line, 0)
+        self.assertEqual(diagnostic.range.end.line, 0)
+        self.assertEqual(diagnostic.range.start.character, 7)
+        self.assertEqual(diagnostic.range.end.character, 7)
+        self.assertEqual(diagnostic.message, "Final newline missing")
 
     def test_parse_python(self):
         """Test check parsing embedded KvLang language in python file."""
@@ -112,11 +183,11 @@ class KvLintTest(unittest.TestCase):
         self.assertIsInstance(diagnostics, list)
         self.assertEqual(len(diagnostics), 1)
         if len(diagnostics) == 1:
-            self.assertEqual(diagnostics[0]["range"]["start"]['line'], 2)
-            self.assertEqual(diagnostics[0]["range"]["end"]['line'], 2)
-            self.assertEqual(diagnostics[0]["range"]["start"]['character'], 0)
-            self.assertEqual(diagnostics[0]["range"]["end"]['character'], 0)
-            self.assertEqual(diagnostics[0]["message"], "Invalid rule (must be inside <>)")
+            self.assertEqual(diagnostics[0].range.start.line, 2)
+            self.assertEqual(diagnostics[0].range.end.line, 2)
+            self.assertEqual(diagnostics[0].range.start.character, 0)
+            self.assertEqual(diagnostics[0].range.end.character, 13)
+            self.assertEqual(diagnostics[0].message, "Invalid rule (must be inside <>)")
 
         # Lack of embedded kvlang in python file
         self.python_document.text = '#<KvLang>{}<AnchorLayout{}#</KvLa'.format(EOL, EOL)
@@ -124,6 +195,33 @@ class KvLintTest(unittest.TestCase):
         self.assertIsInstance(diagnostics, list)
         self.assertEqual(len(diagnostics), 0)
 
+    def test_parse_load_string(self):
+        """Test check parsing KvLang strings passed to Builder.load_string in python file."""
+        self.python_document.text = 'from kivy.lang import Builder{0}KV = """{0}<Widget>:{0}'\
+                                    '    size: 1, 1{0}"""{0}Builder.load_string(KV){0}'\
+                                    'Builder.load_string("<AnchorLayout"){0}'.format(EOL)
+        diagnostics = self.kvlint.parse(self.python_document)
+        self.assertEqual(len(diagnostics), 1)
+        self.assertEqual(diagnostics[0].range.start.line, 6)
+        self.assertEqual(diagnostics[0].message, "Invalid rule (must be inside <>)")
+
+        # Fixed string is linted again after incremental extraction
+        self.python_document.text = self.python_document.text.replace("<AnchorLayout", "<A>:")
+        self.assertEqual(self.kvlint.parse(self.python_document), [])
+
+        # Columns of the first line are counted from the beginning of the python line
+        self.python_document.text = u'x = "\U0001F600"; Builder.load_string("<Bad"){0}'.format(EOL)
+        diagnostics = self.kvlint.parse(self.python_document)
+        self.assertEqual(len(diagnostics), 1)
+        self.assertEqual(diagnostics[0].range.serialize(),
+                         {'start': {'line': 0, 'character': 31},
+                          'end': {'line': 0, 'character': 35}})
+
+        # String with escape sequence is not linted at the wrong line
+        self.python_document.text = 'Builder.load_string("<A>:\\n    text: a +"){0}{0}{0}'\
+                                    .format(EOL)
+        self.assertEqual(self.kvlint.parse(self.python_document), [])
+
     def test_parse_other(self):
         """Test check parsing other file than python and kv."""
         self.other_document.text = '#<KvLang>{}<AnchorLayout{}#</KvLang>'.format(EOL, EOL)
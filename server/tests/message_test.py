@@ -3,6 +3,7 @@ from __future__ import absolute_import
 import unittest
 from kvls.message import NotificationMessage, ResponseMessage, RequestMessage, ErrorCodes, \
     MessageUtils, Message
+from kvls.protocol import Diagnostic, Position, Range, dumps, line_range
 from kvls.utils import EOL_LSP, CHARSET
 
 class MessageTest(unittest.TestCase):
@@ -25,15 +26,30 @@ class MessageTest(unittest.TestCase):
 
     def test_message_base_class(self):
         """Test build method of the bas Message class."""
-        message = Message()
-        message.message_content = {"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics",
-                                   "params": {"uri":"path", "diagnostics":[]}}
+        message = NotificationMessage()
+        message.content({"uri":"path", "diagnostics":[]}, "textDocument/publishDiagnostics")
         content_str = '{"jsonrpc":"2.0","method":"textDocument/publishDiagnostics",'\
                       '"params":{"uri":"path","diagnostics":[]}}'
         expected = 'Content-Length: {}{}Content-Type: ' \
                    'application/vscode-jsonrpc; charset={}{}{}{}'. \
                    format(len(content_str), EOL_LSP, CHARSET, EOL_LSP, EOL_LSP, content_str)
         self.assertEqual(expected, message.build())
+        self.assertDictEqual(Message().message_content, {"jsonrpc": "2.0"})
+
+    def test_message_diagnostic(self):
+        """Test build of the message with diagnostic structures."""
+        message = NotificationMessage()
+        diagnostic = Diagnostic(line_range(3, 1, 4), "Trailing whitespace", 3, "I002", "KvLint")
+        message.content({"uri": "path", "diagnostics": [diagnostic]},
+                        "textDocument/publishDiagnostics")
+        self.assertNotEqual(message.build().find(
+            '"diagnostics":[{"range":{"start":{"line":3,"character":1},"end":{"line":3,'
+            '"character":4}},"severity":3,"code":"I002","source":"KvLint",'
+            '"message":"Trailing whitespace"}]'), -1)
+        self.assertEqual(dumps(Range(Position(0, 1), Position(2, 3))),
+                         '{"start":{"line":0,"character":1},"end":{"line":2,"character":3}}')
+        with self.assertRaises(TypeError):
+            dumps(object())
 
     def test_notification_message(self):
         """Test checking notification message methods."""
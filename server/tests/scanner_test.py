@@ -0,0 +1,86 @@
+"""Unit tests for Scanner module."""
+from __future__ import absolute_import
+import unittest
+import os
+import shutil
+import tempfile
+# Disable UnitTest.
+os.environ["KIVY_UNITTEST"] = "0"
+from kvls.scanner import WorkspaceScanner, FileChangeType, read_content # pylint: disable=C0413
+from kvls.workspace import Workspace # pylint: disable=C0413
+from kvls.utils import path_to_uri # pylint: disable=C0413
+
+class WorkspaceScannerTest(unittest.TestCase):
+    """WorkspaceScanner UnitTest."""
+
+    def setUp(self):
+        """Create workspace with KvLang and Python files."""
+        self.root = os.path.realpath(tempfile.mkdtemp())
+        os.mkdir(os.path.join(self.root, ".git"))
+        self.write(".git/hidden.kv", "#:include main.kv\n")
+        self.write("main.kv", "#:include widgets.kv\n<Main>:\n")
+        self.write("widgets.kv", "<Widgets>:\n")
+        self.write("app.py", "Builder.load_string('''\n#:include widgets.kv\n''')\n")
+        self.write("plain.py", "import os\n")
+        self.workspace = Workspace(self.root)
+        self.scanner = WorkspaceScanner(self.workspace, threads=2)
+
+    def tearDown(self):
+        """Cleanup of the tests."""
+        shutil.rmtree(self.root)
+
+    def path(self, name):
+        """Return path of the file in the workspace."""
+        return os.path.join(self.root, name)
+
+    def write(self, name, text):
+        """Write file to the workspace."""
+        with open(self.path(name), mode="w") as file:
+            file.write(text)
+
+    def test_read_content(self):
+        """Test check that Python files without KvLang are not read."""
+        self.assertIsNone(read_content(self.path("plain.py"), "python"))
+        self.assertEqual(read_content(self.path("app.py"), "python")[:7], b"Builder")
+        self.assertEqual(read_content(self.path("widgets.kv"), "kv"), b"<Widgets>:\n")
+
+    def test_scan(self):
+        """Test check initial scan and rescan of the unchanged workspace."""
+        affected = self.scanner.scan([self.root])
+        self.assertEqual(affected, set([self.path("main.kv"), self.path("widgets.kv"),
+                                        self.path("app.py"), self.path("plain.py")]))
+        self.assertEqual(self.workspace.transitive_dependents(self.path("widgets.kv")),
+                         set([self.path("main.kv"), self.path("app.py")]))
+        self.assertIsNone(self.scanner.manifest[self.path("plain.py")][1])
+        self.assertNotIn(self.path(".git/hidden.kv"), self.scanner.manifest)
+        self.assertEqual(self.scanner.scan([self.root]), set())
+
+        os.remove(self.path("main.kv"))
+        self.assertEqual(self.scanner.scan([self.root]), set([self.path("main.kv")]))
+        self.assertEqual(self.workspace.transitive_dependents(self.path("widgets.kv")),
+                         set([self.path("app.py")]))
+
+    def test_stamps(self):
+        """Test check that files are stat in chunks and missing known files at the end."""
+        self.scanner.CHUNK = 2
+        self.scanner.scan([self.root])
+        os.remove(self.path("main.kv"))
+        chunks = list(self.scanner.stamps([self.root]))
+        self.assertEqual([len(stamps) for stamps in chunks], [2, 1, 1])
+        self.assertEqual(chunks[-1], [(self.path("main.kv"), None)])
+        self.assertEqual(self.scanner.update(chunks[-1]), set([self.path("main.kv")]))
+
+    def test_changed(self):
+        """Test check processing of the watched file events."""
+        self.scanner.scan([self.root])
+        self.write("main.kv", "<Main>:\n")
+        os.utime(self.path("main.kv"), (0, 0))
+        os.utime(self.path("widgets.kv"), (0, 0))
+        changes = [{"uri": path_to_uri(self.path("main.kv")), "type": FileChangeType.CHANGED},
+                   {"uri": path_to_uri(self.path("widgets.kv")), "type": FileChangeType.CHANGED},
+                   {"uri": path_to_uri(self.path("app.py")), "type": FileChangeType.DELETED}]
+        # Content of widgets.kv is the same. Only stamp is updated.
+        self.assertEqual(self.scanner.changed(changes),
+                         set([self.path("main.kv"), self.path("app.py")]))
+        self.assertEqual(self.workspace.transitive_dependents(self.path("widgets.kv")), set())
+        self.assertEqual(self.scanner.manifest[self.path("widgets.kv")][0][0], 0)
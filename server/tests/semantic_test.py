@@ -0,0 +1,74 @@
+"""Unit tests for Semantic module."""
+from __future__ import absolute_import
+import unittest
+from array import array
+from kvls.semantic import TokenType, TokenModifier, tokenize, encode, delta, document_data, \
+    document_tokens
+from kvls.syntax import scan, LineKind
+from kvls.document import TextDocumentItem
+
+KV_TEXT = """#:import utils kivy.utils
+<Root@BoxLayout>:
+    # comment
+    Label:
+        id: title
+        text: 'Title'
+    Button:
+        on_press: title.text = 'Pressed'
+        canvas.before:
+            Color:
+                rgba: 1, 1, 1, 1
+"""
+
+class SemanticTest(unittest.TestCase):
+    """Semantic tokens UnitTest."""
+
+    def test_scan(self):
+        """Test check classification of the KvLang lines."""
+        kinds = [kv_line.kind for kv_line in scan(KV_TEXT)]
+        self.assertEqual(kinds, [LineKind.DIRECTIVE, LineKind.RULE, LineKind.COMMENT,
+                                 LineKind.WIDGET, LineKind.PROPERTY, LineKind.PROPERTY,
+                                 LineKind.WIDGET, LineKind.PROPERTY, LineKind.CANVAS,
+                                 LineKind.WIDGET, LineKind.PROPERTY])
+
+    def test_tokenize(self):
+        """Test check tokens of the KvLang text."""
+        tokens = tokenize(scan(KV_TEXT))
+        self.assertEqual(tokens[:5], [(0, 0, 8, TokenType.MACRO, TokenModifier.NONE),
+                                      (0, 9, 5, TokenType.VARIABLE, TokenModifier.DECLARATION),
+                                      (0, 15, 10, TokenType.NAMESPACE, TokenModifier.NONE),
+                                      (1, 1, 4, TokenType.CLASS, TokenModifier.DECLARATION),
+                                      (1, 6, 9, TokenType.CLASS, TokenModifier.NONE)])
+        self.assertIn((4, 8, 2, TokenType.KEYWORD, TokenModifier.NONE), tokens)
+        self.assertIn((4, 12, 5, TokenType.VARIABLE, TokenModifier.DECLARATION), tokens)
+        self.assertIn((7, 8, 8, TokenType.EVENT, TokenModifier.NONE), tokens)
+        self.assertIn((7, 18, 5, TokenType.VARIABLE, TokenModifier.NONE), tokens)
+        self.assertIn((8, 8, 13, TokenType.KEYWORD, TokenModifier.NONE), tokens)
+
+    def test_encode(self):
+        """Test check relative encoding of the tokens."""
+        tokens = [(1, 4, 5, 0, 0), (1, 12, 3, 1, 0), (3, 2, 4, 2, 1)]
+        self.assertEqual(encode(tokens), array('I', [1, 4, 5, 0, 0, 0, 8, 3, 1, 0,
+                                                     2, 2, 4, 2, 1]))
+        self.assertEqual(encode(tokens, 3, 3), array('I', [3, 2, 4, 2, 1]))
+        document = TextDocumentItem("file.py", "python", KV_TEXT)
+        self.assertEqual(len(document_data(document)), 0)
+
+    def test_delta(self):
+        """Test check delta edits between two encoded results."""
+        previous = array('I', [0, 0, 4, 0, 0, 1, 4, 2, 1, 0])
+        self.assertEqual(delta(previous, array('I', previous)), [])
+        current = array('I', [0, 0, 4, 0, 0, 2, 4, 2, 1, 0])
+        self.assertEqual(delta(previous, current), [{'start': 5, 'deleteCount': 1,
+                                                     'data': array('I', [2])}])
+        current = array('I', [0, 0, 4, 0, 0])
+        self.assertEqual(delta(previous, current), [{'start': 5, 'deleteCount': 5,
+                                                     'data': array('I')}])
+
+    def test_utf16_tokens(self):
+        """Test check that tokens after non-BMP characters are shifted in UTF-16 code units."""
+        document = TextDocumentItem("file.kv", "kv", u"<Root>:\n    # \U0001F600\n"
+                                                     u"    text: '\U0001F600' + self.x  # a\n")
+        tokens = [(line, start, length) for line, start, length, _, _ in
+                  document_tokens(document)]
+        self.assertEqual(tokens, [(0, 1, 4), (1, 4, 4), (2, 4, 4)])
@@ -2,9 +2,15 @@
 from __future__ import absolute_import
 import unittest
 import os
+import shutil
+import sys
+import tempfile
 # Disable UnitTest.
 os.environ["KIVY_UNITTEST"] = "0"
 from kvls.kvlangserver import KvLangServer # pylint: disable=C0413
+from kvls.document import TextDocumentItem # pylint: disable=C0413
+from kvls.kvlint import parse_exception # pylint: disable=C0413
+from kvls.message import ResponseMessage, NotificationMessage # pylint: disable=C0413
 from kvls.utils import CharsetException
 
 class ServerTest(unittest.TestCase):
@@ -17,12 +23,22 @@ class ServerTest(unittest.TestCase):
         self.unknown = open('./server/tests/unknown.txt', mode='r')
         self.stdout = open('./server/tests/stdout.txt', mode='w')
         self.charset = open('./server/tests/initialized_unsupported_charset.txt', mode='r')
+        self.profile = open('./server/tests/profile.txt', mode='r')
+        self.configuration = open('./server/tests/configuration.txt', mode='r')
+        self.semantic = open('./server/tests/semantic.txt', mode='r')
+        self.symbol = open('./server/tests/symbol.txt', mode='r')
+        self.tree = open('./server/tests/tree.txt', mode='r')
 
     def tearDown(self):
         """Cleanup of the tests."""
         self.stdin.close()
         self.stdout.close()
         self.diagnostic.close()
+        self.profile.close()
+        self.configuration.close()
+        self.semantic.close()
+        self.symbol.close()
+        self.tree.close()
 
     def test_initialized(self):
         """Test check basic message flow from initialize to exit notification."""
@@ -63,7 +79,7 @@ class ServerTest(unittest.TestCase):
                '"kivy.kv","diagnostics":['
         self.assertNotEqual(content.find(find), -1)
         find = '{"range":{"start":{"line":0,"character":0},"end":' \
-               '{"line":0,"character":0}},"severity":1,"code":"E001","source":"KvLint"' \
+               '{"line":0,"character":17}},"severity":1,"code":"E001","source":"KvLint"' \
                ',"message":"Invalid data after declaration"}'
         self.assertNotEqual(content.find(find), -1)
         # Diagnostic DidOpenTextDocumentParams
@@ -71,7 +87,7 @@ class ServerTest(unittest.TestCase):
                '"kivy.kv","diagnostics":['
         self.assertNotEqual(content.find(find), -1)
         find = '{"range":{"start":{"line":0,"character":0},"end":' \
-               '{"line":0,"character":0}},"severity":1,"code":"E001","source":"KvLint"' \
+               '{"line":0,"character":13}},"severity":1,"code":"E001","source":"KvLint"' \
                ',"message":"Invalid rule (must be inside <>)"}'
         self.assertNotEqual(content.find(find), -1)
 
@@ -112,3 +128,226 @@ class ServerTest(unittest.TestCase):
         self.assertTrue(is_file, "Logger file should exist")
         if is_file:
             os.remove(server.logger.file_name)
+
+    def test_server_profiler(self):
+        """Test check profiler functionality and dump of the profile on request."""
+        server = KvLangServer(self.profile, self.stdout)
+        server.profiler.enable_profile_mode(["PROFILE_MODE"])
+        server_exit_code = server.run()
+        self.assertEqual(server_exit_code, KvLangServer.EXIT_SUCCESS)
+        results = open('./server/tests/stdout.txt', mode='r')
+        content = "".join(results.readlines())
+        results.close()
+        find = '{"jsonrpc":"2.0","id":7,"result":{"enabled":true,"file":"KvLangProfile.prof"}}'
+        self.assertNotEqual(content.find(find), -1)
+        is_file = os.path.isfile(server.profiler.file_name)
+        self.assertTrue(is_file, "Profile file should exist")
+        if is_file:
+            os.remove(server.profiler.file_name)
+
+    def test_server_profiler_disabled(self):
+        """Test check that profile is not created when profile mode is off."""
+        server = KvLangServer(self.profile, self.stdout)
+        server_exit_code = server.run()
+        self.assertEqual(server_exit_code, KvLangServer.EXIT_SUCCESS)
+        results = open('./server/tests/stdout.txt', mode='r')
+        content = "".join(results.readlines())
+        results.close()
+        find = '{"jsonrpc":"2.0","id":7,"result":{"enabled":false,"file":null}}'
+        self.assertNotEqual(content.find(find), -1)
+        self.assertFalse(os.path.isfile(server.profiler.file_name),
+                         "Profile file should not exist")
+
+    def test_configuration(self):
+        """Test check configuration of KvLint from workspace/configuration and settings."""
+        server = KvLangServer(self.configuration, self.stdout)
+        server_exit_code = server.run()
+        self.assertEqual(server_exit_code, KvLangServer.EXIT_SUCCESS)
+        results = open('./server/tests/stdout.txt', mode='r')
+        content = "".join(results.readlines())
+        results.close()
+        find = '{"jsonrpc":"2.0","id":1,"method":"workspace/configuration",' \
+               '"params":{"items":[{"section":"kvlang.lint"}]}}'
+        self.assertNotEqual(content.find(find), -1)
+        # Diagnostic DidOpenTextDocumentParams with maxLineLength from client
+        self.assertNotEqual(content.find('"code":"I001","source":"KvLint",'
+                                         '"message":"Line to long (16,12)"'), -1)
+        self.assertNotEqual(content.find('"code":"I002"'), -1)
+        # Diagnostic after DidChangeConfiguration with disabled rules
+        find = '{"jsonrpc":"2.0","method":"textDocument/publishDiagnostics","params":{"uri":' \
+               '"config.kv","diagnostics":[]}}'
+        self.assertNotEqual(content.find(find), -1)
+        # Settings are requested again and document is linted only after response
+        self.assertNotEqual(content.find('"id":2,"method":"workspace/configuration"'), -1)
+        self.assertEqual(content.count('"method":"textDocument/publishDiagnostics"'), 2)
+        self.assertEqual(server.kvlint.config.disable, frozenset(["I001", "I002"]))
+        self.assertEqual(server.kvlint.config.max_line_length, 110)
+
+    def test_folder_configuration(self):
+        """Test check that every workspace folder use its own .kvlintrc and settings."""
+        directory = tempfile.mkdtemp()
+        try:
+            first = os.path.join(directory, "first")
+            second = os.path.join(directory, "second")
+            for folder in (first, second):
+                os.mkdir(folder)
+            with open(os.path.join(first, ".kvlintrc"), mode="w") as file:
+                file.write('{"maxLineLength": 5}')
+            server = KvLangServer(self.stdin, self.stdout)
+            server.folders = [first, second]
+            response = ResponseMessage()
+            response.assign_message_content({"id": 1, "result": [
+                {"disable": None, "maxLineLength": None},
+                {"disable": None, "maxLineLength": None}, "python",
+                {"disable": ["I002"], "maxLineLength": 8}, None]})
+            server.configuration(response)
+            self.assertEqual(server.configs[first].max_line_length, 5)
+            self.assertEqual(server.configs[second].max_line_length, 8)
+            self.assertFalse(server.configs[second].enabled("I002"))
+            self.assertEqual(server.kvlint.config.max_line_length, 110)
+            self.assertEqual(server.interpreters, {first: "python"})
+            document = TextDocumentItem("file://" + first + "/main.kv", "kv", "<Widget>:\n")
+            self.assertEqual(server.folder(document.uri, server.configs), first)
+            self.assertEqual([diagnostic.code for diagnostic in server.kvlint.parse(
+                document, server.configs[first])], ["I001"])
+            # Plan of the folder configuration is compiled only once
+            compiled = []
+            compile_plan = server.kvlint.compile
+            server.kvlint.compile = lambda config: compiled.append(config) or compile_plan(config)
+            server.publish(document)
+            server.publish(document)
+            self.assertEqual(compiled, [])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_watched_files(self):
+        """Test check background scan and imports resolved again after watched file events."""
+        directory = os.path.realpath(tempfile.mkdtemp())
+        try:
+            with open(os.path.join(directory, "widgets.kv"), mode="w") as file:
+                file.write("<Widgets>:\n")
+            server = KvLangServer(self.stdin, self.stdout)
+            server.folders = [directory]
+            server.workspace.set_root(directory)
+            server.initialized(None)
+            server.scan_thread.join()
+            self.assertIn(os.path.join(directory, "widgets.kv"), server.scanner.manifest)
+            uri = "file://" + directory + "/main.kv"
+            server.document_manager.add(TextDocumentItem(uri, "kv", "#:import x kvls_module\n"))
+            self.assertEqual([diagnostic.code for diagnostic in server.kvlint.parse(
+                server.document_manager.get(uri))], ["W001"])
+            module = os.path.join(directory, "kvls_module.py")
+            with open(module, mode="w") as file:
+                file.write("VALUE = 1\n")
+            notification = NotificationMessage()
+            notification.assign_message_content({"method": "workspace/didChangeWatchedFiles",
+                                                 "params": {"changes": [
+                                                     {"uri": "file://" + module, "type": 1}]}})
+            server.did_change_watched_files(notification)
+            self.assertIn(module, server.workspace.modules.values())
+            self.assertEqual(server.kvlint.parse(server.document_manager.get(uri)), [])
+            os.remove(module)
+            notification.params["changes"][0]["type"] = 3
+            server.did_change_watched_files(notification)
+            self.assertNotIn(module, server.workspace.modules.values())
+            self.assertEqual([diagnostic.code for diagnostic in server.kvlint.parse(
+                server.document_manager.get(uri))], ["W001"])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_interpreter(self):
+        """Test check python path of the workspace folder and routing of the parser."""
+        server = KvLangServer(self.stdin, self.stdout)
+        root = os.path.abspath("project")
+        server.interpreters = {root: sys.executable,
+                               os.path.join(root, "nested"): "missing-python"}
+        self.assertEqual(server.interpreter("file://" + root + "/main.kv"), sys.executable)
+        self.assertEqual(server.interpreter("file://" + root + "/nested/main.kv"),
+                         "missing-python")
+        self.assertIsNone(server.interpreter("file://" + root + "2/main.kv"))
+        # Current and unknown interpreter parse document in the server
+        document = TextDocumentItem("file://" + root + "/nested/main.kv", "kv", "<Widget")
+        self.assertIsNotNone(server.parse_exception(document, 0))
+        self.assertEqual(server.workers.workers, {})
+
+    @unittest.skipUnless(os.name == "posix", "Shell script interpreter requires POSIX system")
+    def test_interpreter_banner(self):
+        """Test check that interpreter writing banner to stdout fall back to server parser."""
+        directory = tempfile.mkdtemp()
+        try:
+            python = os.path.join(directory, "python")
+            with open(python, mode="w") as file:
+                file.write("#!/bin/sh\necho 'Python banner'\nexec '{}' \"$@\"\n".format(
+                    sys.executable))
+            os.chmod(python, 0o755)
+            server = KvLangServer(self.stdin, self.stdout)
+            server.interpreters = {directory: python}
+            document = TextDocumentItem("file://" + directory + "/main.kv", "kv", "<Widget")
+            self.assertEqual(server.parse_exception(document, 0).serialize(),
+                             parse_exception(document, 0).serialize())
+            self.assertIsNone(server.workers.workers[python].process)
+            server.workers.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_semantic_tokens(self):
+        """Test check full, delta and range semantic tokens requests."""
+        server = KvLangServer(self.semantic, self.stdout)
+        server_exit_code = server.run()
+        self.assertEqual(server_exit_code, KvLangServer.EXIT_SUCCESS)
+        results = open('./server/tests/stdout.txt', mode='r')
+        content = "".join(results.readlines())
+        results.close()
+        find = '{"jsonrpc":"2.0","id":2,"result":{"resultId":"1","data":' \
+               '[0,1,4,0,1,1,4,5,0,0,1,8,4,1,0]}}'
+        self.assertNotEqual(content.find(find), -1)
+        find = '{"jsonrpc":"2.0","id":3,"result":{"resultId":"2","edits":' \
+               '[{"start":7,"deleteCount":1,"data":[6]}]}}'
+        self.assertNotEqual(content.find(find), -1)
+        find = '{"jsonrpc":"2.0","id":4,"result":{"data":[2,8,4,1,0]}}'
+        self.assertNotEqual(content.find(find), -1)
+
+    def test_workspace_symbol(self):
+        """Test check workspace symbols streamed by $/progress and returned in response."""
+        server = KvLangServer(self.symbol, self.stdout)
+        server_exit_code = server.run()
+        self.assertEqual(server_exit_code, KvLangServer.EXIT_SUCCESS)
+        results = open('./server/tests/stdout.txt', mode='r')
+        content = "".join(results.readlines())
+        results.close()
+        self.assertNotEqual(content.find('"workspaceSymbolProvider":{"workDoneProgress":true}'),
+                            -1)
+        begin = content.find('{"token":"work","value":{"kind":"begin"')
+        partial = content.find('{"token":"partial","value":[{"name":"MyButton","kind":5')
+        end = content.find('{"token":"work","value":{"kind":"end"}}')
+        self.assertTrue(-1 < begin < partial < end)
+        # Final result is empty when it was sent as partial result
+        self.assertNotEqual(content.find('{"jsonrpc":"2.0","id":1,"result":[]}'), -1)
+        self.assertNotEqual(content.find('{"name":"title","kind":13,"location":{"uri":"symbol.kv",'
+                                         '"range":{"start":{"line":3,"character":12},'
+                                         '"end":{"line":3,"character":17}}},'
+                                         '"containerName":"MyButton"}'), -1)
+
+    def test_tree(self):
+        """Test check folding ranges, selection ranges and hover of the document."""
+        server = KvLangServer(self.tree, self.stdout)
+        server_exit_code = server.run()
+        self.assertEqual(server_exit_code, KvLangServer.EXIT_SUCCESS)
+        results = open('./server/tests/stdout.txt', mode='r')
+        content = "".join(results.readlines())
+        results.close()
+        self.assertNotEqual(content.find('"hoverProvider":true'), -1)
+        self.assertNotEqual(content.find('{"jsonrpc":"2.0","id":1,"result":['
+                                         '{"startLine":2,"endLine":3},'
+                                         '{"startLine":5,"endLine":6},'
+                                         '{"startLine":0,"endLine":1,"kind":"imports"}]}'), -1)
+        self.assertNotEqual(content.find('{"jsonrpc":"2.0","id":2,"result":[{"range":'
+                                         '{"start":{"line":3,"character":4},'
+                                         '"end":{"line":3,"character":8}},"parent":{"range":'
+                                         '{"start":{"line":3,"character":4},'
+                                         '"end":{"line":3,"character":17}}'), -1)
+        self.assertNotEqual(content.find('{"jsonrpc":"2.0","id":4,"result":null}'), -1)
+        if server.kvlint.KIVY_IMPORTED:
+            self.assertNotEqual(content.find('"id":3,"result":{"contents":{"kind":"plaintext",'
+                                             '"value":"kivy.uix.label.Label'), -1)
+            self.assertEqual(list(server.docstrings), [(None, "Label")])
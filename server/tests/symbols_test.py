@@ -0,0 +1,79 @@
+"""Unit tests for Symbols module."""
+from __future__ import absolute_import
+import unittest
+import os
+import shutil
+import tempfile
+from kvls.symbols import SymbolIndex, SymbolKind, document_symbols, matches
+from kvls.document import TextDocumentItem
+from kvls.progress import Progress
+
+class SymbolsTest(unittest.TestCase):
+    """Symbols UnitTest."""
+
+    def test_matches(self):
+        """Test check case insensitive matching of the query characters."""
+        self.assertTrue(matches("", "Button"))
+        self.assertTrue(matches("btn", "MyButton"))
+        self.assertFalse(matches("nb", "MyButton"))
+
+    def test_python_symbols(self):
+        """Test check symbols of the KvLang strings in python document."""
+        document = TextDocumentItem("file.py", "python", "Builder.load_string('''\n"
+                                                         "<-Root,Other@Label>:\n''')\n")
+        symbols = [(name, kind, symbol_range.start.line, symbol_range.start.character)
+                   for name, kind, symbol_range, _ in document_symbols(document)]
+        self.assertEqual(symbols, [("Root", SymbolKind.CLASS, 1, 2),
+                                   ("Other", SymbolKind.CLASS, 1, 7)])
+
+    def test_index(self):
+        """Test check that symbols of the file are read again only after stamp change."""
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "main.kv")
+            with open(path, mode="w") as file:
+                file.write("<Main>:\n")
+            index = SymbolIndex()
+            uri, symbols = index.file_symbols(path, (1, 8), "kv")
+            self.assertTrue(uri.startswith("file://"))
+            self.assertEqual([symbol[0] for symbol in symbols], ["Main"])
+            with open(path, mode="w") as file:
+                file.write("<Changed>:\n")
+            self.assertIs(index.file_symbols(path, (1, 8), "kv")[1], symbols)
+            self.assertEqual(index.file_symbols(path, (2, 11), "kv")[1][0][0], "Changed")
+            index.prune([])
+            self.assertEqual(index.files, {})
+        finally:
+            shutil.rmtree(directory)
+
+class ProgressTest(unittest.TestCase):
+    """Progress UnitTest."""
+
+    def setUp(self):
+        """Create list of the sent messages."""
+        self.messages = []
+
+    def test_partial_result(self):
+        """Test check that chunks are sent with partialResultToken and result is empty."""
+        progress = Progress(self.messages.append, {"partialResultToken": 1})
+        progress.begin("Work")
+        progress.add([1, 2])
+        progress.report(50)
+        progress.report(60)
+        progress.add([3])
+        self.assertEqual(progress.result, [])
+        self.assertEqual([message.params for message in self.messages],
+                         [{'token': 1, 'value': [1, 2]}, {'token': 1, 'value': [3]}])
+
+    def test_work_done(self):
+        """Test check progress notifications and result without partialResultToken."""
+        progress = Progress(self.messages.append, {"workDoneToken": "token"})
+        progress.begin("Work")
+        progress.add([1])
+        progress.report(50.5, "half")
+        progress.end()
+        self.assertEqual(progress.result, [1])
+        self.assertEqual([message.params["value"]["kind"] for message in self.messages],
+                         ["begin", "report", "end"])
+        self.assertEqual(self.messages[1].params["value"],
+                         {'kind': 'report', 'percentage': 50, 'message': 'half'})
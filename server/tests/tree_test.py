@@ -0,0 +1,69 @@
+"""Unit tests for Tree module."""
+from __future__ import absolute_import
+import unittest
+from kvls.document import TextDocumentItem
+from kvls.tree import FoldingRangeKind, document_tree, folding_ranges, selection_range, \
+    class_name
+
+TEXT = ("#:import os os\n"
+        "#:import sys sys\n"
+        "<MyButton@Button>:\n"
+        "    # comment\n"
+        "    text: 'Hello'\n"
+        "    canvas:\n"
+        "        Color:\n"
+        "            rgb: 1, 1, 1\n"
+        "\n"
+        "BoxLayout:\n"
+        "    Label:\n")
+
+class TreeTest(unittest.TestCase):
+    """Tree UnitTest."""
+
+    def setUp(self):
+        """Create document with rules, widgets and imports."""
+        self.document = TextDocumentItem("file.kv", "kv", TEXT)
+
+    def test_tree(self):
+        """Test check nesting of the nodes and lookup of the lines."""
+        tree = self.document.cached("tree", document_tree)
+        self.assertEqual([node.kv_line.line for node in tree.roots], [0, 1, 2, 9])
+        self.assertEqual([node.kv_line.line for node in tree.roots[2].children], [4, 5])
+        self.assertEqual(tree.roots[2].end_line, 7)
+        self.assertIs(tree.node(3), tree.roots[2])
+        self.assertIs(tree.node(7).parent.parent, tree.roots[2].children[1])
+        self.assertIsNone(tree.node(8))
+        # Tree is built again only after change of the text
+        self.assertIs(self.document.cached("tree", document_tree), tree)
+        self.document.text = "Label:\n"
+        self.assertIsNot(self.document.cached("tree", document_tree), tree)
+
+    def test_folding_ranges(self):
+        """Test check folding of the blocks and consecutive imports."""
+        self.assertEqual([folding.serialize() for folding in folding_ranges(self.document)],
+                         [{'startLine': 2, 'endLine': 7}, {'startLine': 5, 'endLine': 7},
+                          {'startLine': 6, 'endLine': 7}, {'startLine': 9, 'endLine': 10},
+                          {'startLine': 0, 'endLine': 1, 'kind': FoldingRangeKind.IMPORTS}])
+
+    def test_selection_range(self):
+        """Test check expansion from the value to the top level block."""
+        selection = selection_range(self.document, {'line': 4, 'character': 12})
+        ranges = []
+        while selection is not None:
+            current = selection.range
+            ranges.append((current.start.line, current.start.character,
+                           current.end.line, current.end.character))
+            selection = selection.parent
+        self.assertEqual(ranges, [(4, 10, 4, 17), (4, 4, 4, 17), (2, 0, 7, 24)])
+        selection = selection_range(self.document, {'line': 8, 'character': 0})
+        self.assertIsNone(selection.parent)
+
+    def test_class_name(self):
+        """Test check class names of the rules and widgets under the position."""
+        name, name_range = class_name(self.document, {'line': 2, 'character': 12})
+        self.assertEqual((name, name_range.start.character, name_range.end.character),
+                         ("Button", 10, 16))
+        self.assertEqual(class_name(self.document, {'line': 10, 'character': 4})[0], "Label")
+        self.assertIsNone(class_name(self.document, {'line': 4, 'character': 4}))
+        document = TextDocumentItem("file.kv", "kv", u"<\U0001F600>:\n    Label:\n")
+        self.assertIsNone(class_name(document, {'line': 0, 'character': 1}))
@@ -0,0 +1,116 @@
+"""Unit tests for Worker module."""
+from __future__ import absolute_import
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+# Disable UnitTest.
+os.environ["KIVY_UNITTEST"] = "0"
+from kvls.worker import Worker, WorkerPool, WorkerException # pylint: disable=C0413
+from kvls.document import TextDocumentItem # pylint: disable=C0413
+from kvls.kvlint import parse_exception # pylint: disable=C0413
+from kvls.lang import class_docstring # pylint: disable=C0413
+from kvls.workspace import Workspace, find_module # pylint: disable=C0413
+from kvls.expression import analyze # pylint: disable=C0413
+from kvls.kvlangserver import KvLangServer # pylint: disable=C0413
+
+class WorkerTest(unittest.TestCase):
+    """Worker UnitTest."""
+
+    def setUp(self):
+        """Create worker of the current interpreter."""
+        self.worker = Worker(sys.executable)
+
+    def tearDown(self):
+        """Cleanup of the tests."""
+        self.worker.stop()
+
+    def test_parse(self):
+        """Test check that worker return the same diagnostic as server."""
+        for text in ("<Widget>:\n", "<AnchorLayout\n"):
+            expected = parse_exception(TextDocumentItem("file.kv", "kv", text), 0)
+            result = self.worker.call("parse", {"text": text})
+            if expected is None:
+                self.assertIsNone(result)
+            else:
+                self.assertEqual(result, expected.serialize())
+        self.assertEqual(self.worker.call("version", {})["python"], sys.version.split()[0])
+        self.assertEqual(self.worker.call("docstring", {"name": "Label"}),
+                         class_docstring("Label"))
+
+    def test_module(self):
+        """Test check that imports are resolved by sys.path of the worker."""
+        self.assertEqual(self.worker.call("module", {"name": "json", "paths": []}),
+                         find_module("json"))
+        self.assertIsNone(self.worker.call("module", {"name": "not_module"}))
+        workspace = Workspace(worker=lambda uri: self.worker)
+        document = TextDocumentItem("file.kv", "kv", "#:import x json\n#:import y not_module\n")
+        self.assertEqual([diagnostic.range.start.line
+                          for diagnostic in workspace.import_exception(document, 0)], [1])
+        self.assertEqual(list(workspace.modules),
+                         [(self.worker.executable, workspace.search_paths("file.kv"), "json")])
+
+    def test_document_interpreter(self):
+        """Test check that included files and expressions are checked by the worker."""
+        directory = os.path.realpath(tempfile.mkdtemp())
+        try:
+            path = os.path.join(directory, "broken.kv")
+            with open(path, mode="w") as file:
+                file.write("<Broken\n")
+            server = KvLangServer(None, None)
+            server.worker = lambda uri: self.worker
+            server.workspace.worker = server.worker
+            document = TextDocumentItem("file://" + directory + "/main.kv", "kv",
+                                        "#:include broken.kv\n<Main>:\n    text: name +\n")
+            self.assertEqual(sorted(diagnostic.code for diagnostic in server.kvlint.parse(document)
+                                    if diagnostic.code in ("E003", "E004")), ["E003", "E004"])
+            # Results are cached per interpreter
+            self.assertEqual(list(server.workspace.errors[path]), [self.worker.executable])
+            self.assertEqual(document.cached(("expressions", self.worker.executable), None),
+                             [tuple(result) for result in analyze(document)])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_failure(self):
+        """Test check errors of the unknown procedure and missing interpreter."""
+        with self.assertRaises(WorkerException):
+            self.worker.call("unknown", {})
+        # Worker is still running after error of the procedure
+        self.assertIsNone(self.worker.call("parse", {"text": "<Widget>:\n"}))
+        with self.assertRaises(WorkerException):
+            Worker(os.path.join(os.path.dirname(__file__), "missing")).call("version", {})
+
+    def test_misbehaving_interpreter(self):
+        """Test check that banner or hang of the worker raise exception and kill the worker."""
+        directory = tempfile.mkdtemp()
+        try:
+            banner = os.path.join(directory, "banner.py")
+            with open(banner, mode="w") as file:
+                file.write("import json, sys\n"
+                           "print('Python banner')\n"
+                           "sys.stdout.flush()\n"
+                           "for line in iter(sys.stdin.readline, ''):\n"
+                           "    print(json.dumps({'id': json.loads(line)['id'], 'result': 1}))\n"
+                           "    sys.stdout.flush()\n")
+            hang = os.path.join(directory, "hang.py")
+            with open(hang, mode="w") as file:
+                file.write("import time\ntime.sleep(60)\n")
+            worker = Worker(sys.executable, banner)
+            with self.assertRaises(WorkerException):
+                worker.call("version", {})
+            self.assertIsNone(worker.process)
+            worker = Worker(sys.executable, hang, timeout=0.5)
+            with self.assertRaises(WorkerException):
+                worker.call("version", {})
+            self.assertIsNone(worker.process)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_pool(self):
+        """Test check that current or unknown interpreter does not start worker."""
+        pool = WorkerPool()
+        self.assertIsNone(pool.get(None))
+        self.assertIsNone(pool.get(sys.executable))
+        self.assertIsNone(pool.get(os.path.join(os.path.dirname(__file__), "missing")))
+        self.assertEqual(pool.workers, {})
@@ -0,0 +1,92 @@
+"""Unit tests for Workspace module."""
+from __future__ import absolute_import
+import unittest
+import os
+import shutil
+import tempfile
+# Disable UnitTest.
+os.environ["KIVY_UNITTEST"] = "0"
+from kvls.workspace import Workspace, include_reference # pylint: disable=C0413
+from kvls.document import TextDocumentItem # pylint: disable=C0413
+from kvls.kvlint import KvLint # pylint: disable=C0413
+
+class WorkspaceTest(unittest.TestCase):
+    """Workspace UnitTest."""
+
+    def setUp(self):
+        """Create workspace with KvLang files."""
+        self.root = tempfile.mkdtemp()
+        self.write("included.kv", "<Included>:\n    text: 'a'\n")
+        self.write("broken.kv", "<Broken\n")
+        self.workspace = Workspace(self.root)
+
+    def tearDown(self):
+        """Cleanup of the tests."""
+        shutil.rmtree(self.root)
+
+    def write(self, name, text):
+        """Write file to the workspace."""
+        with open(os.path.join(self.root, name), mode="w") as file:
+            file.write(text)
+
+    def document(self, name, text):
+        """Return document stored in the workspace."""
+        return TextDocumentItem("file://" + os.path.join(self.root, name), "kv", text)
+
+    def test_include_reference(self):
+        """Test check parsing of the #:include arguments."""
+        self.assertEqual(include_reference("file.kv"), "file.kv")
+        self.assertEqual(include_reference("force  'file.kv' "), "file.kv")
+        self.assertEqual(include_reference('"my file.kv"'), "my file.kv")
+
+    def test_dependents(self):
+        """Test check transitive dependents of the included file."""
+        first = self.document("first.kv", "#:include second.kv\n")
+        second = self.document("second.kv", "#:include third.kv\n")
+        third = self.document("third.kv", "<Third>:\n")
+        self.assertEqual(self.workspace.update(first), set())
+        self.assertEqual(self.workspace.update(second), set([Workspace.key(first.uri)]))
+        self.assertEqual(self.workspace.update(third),
+                         set([Workspace.key(first.uri), Workspace.key(second.uri)]))
+        second.text = "<Second>:\n"
+        self.workspace.update(second)
+        self.assertEqual(self.workspace.update(third), set())
+
+    def test_diagnostics(self):
+        """Test check diagnostics of the include and import directives."""
+        kvlint = KvLint()
+        self.workspace.register(kvlint)
+        document = self.document("main.kv", "#:include included.kv\n#:include missing.kv\n"
+                                            "#:include force broken.kv\n#:import path os.path\n"
+                                            "#:import join os.path.join\n#:import x not_module\n"
+                                            "#:import y\n<Main>:\n")
+        diagnostics = [(diagnostic.code, diagnostic.range.start.line, diagnostic.message)
+                       for diagnostic in kvlint.parse(document)
+                       if diagnostic.code in ("E002", "E003", "W001")]
+        self.assertEqual(sorted(diagnostics)[:2],
+                         [("E002", 1, "Invalid or unknown file: missing.kv"),
+                          ("E003", 2, "Included file broken.kv contains error at line 1: "
+                                      "Invalid rule (must be inside <>)")])
+        self.assertEqual(sorted(diagnostics)[2:],
+                         [("W001", 5, "Unable to resolve import: not_module"),
+                          ("W001", 6, "Invalid import syntax")])
+        # Missing modules are not cached, found modules are cached per interpreter
+        search_paths = self.workspace.search_paths(Workspace.key(document.uri))
+        self.assertNotIn((None, search_paths, "not_module"), self.workspace.modules)
+        self.assertIn((None, search_paths, "os.path"), self.workspace.modules)
+
+    def test_search_paths(self):
+        """Test check that modules are found next to the document and in its folder."""
+        for folder in ("app", "other"):
+            os.mkdir(os.path.join(self.root, folder))
+        self.write("app/mywidgets.py", "")
+        self.write("other/shared.py", "")
+        other = os.path.join(self.root, "other")
+        self.workspace.set_root(self.root, [self.root, other])
+        document = self.document("app/main.kv", "#:import mw mywidgets\n#:import s shared\n")
+        self.assertEqual([diagnostic.range.start.line
+                          for diagnostic in self.workspace.import_exception(document, 0)], [1])
+        document = self.document("other/main.kv", "#:import s shared\n")
+        self.assertEqual(self.workspace.search_paths(Workspace.key(document.uri)),
+                         (other, self.root))
+        self.assertEqual(self.workspace.import_exception(document, 0), [])
@@ -0,0 +1,10 @@
+"""Script which start KvLang parser worker for the language server running in other interpreter."""
+from __future__ import absolute_import
+import sys
+
+if __name__ == "__main__":
+    # Responses are written to stdout. Any output of the imported modules is moved to stderr.
+    WRITER = sys.stdout
+    sys.stdout = sys.stderr
+    from kvls.worker import serve
+    sys.exit(serve(sys.stdin, WRITER))